@@ -0,0 +1,72 @@
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from utils.drilldown_index import DrilldownIndex, write_full_precision_embeddings
+
+
+def random_index(members, size, levels, **index_kwargs):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((members, size)).astype(np.float32)
+    ids = [str(i) for i in range(members)]
+    drilldowns = [f"Level {i % levels}" for i in range(members)]
+    return DrilldownIndex(embeddings, ids, ids, ["cube"] * members, drilldowns, "random", **index_kwargs)
+
+
+def build(args, **index_kwargs):
+    if args.random:
+        return random_index(args.members, args.size, args.levels, **index_kwargs)
+
+    from config import POSTGRES_ENGINE, SCHEMA_DRILLDOWNS, DRILLDOWNS_TABLE_NAME
+    return DrilldownIndex.from_database(POSTGRES_ENGINE, SCHEMA_DRILLDOWNS, DRILLDOWNS_TABLE_NAME, "multi-qa-mpnet-base-cos-v1", **index_kwargs)
+
+
+def run_queries(index, queries, keys, k):
+    results = []
+    start_time = time.perf_counter()
+    for query, (cube_name, drilldown) in zip(queries, keys):
+        results.append([match[0] for match in index.search(query, cube_name, [drilldown], content_limit=k)])
+    return results, (time.perf_counter() - start_time) / len(queries) * 1000
+
+
+def main(args):
+    exact = build(args)
+    rng = np.random.default_rng(1)
+
+    # queries close to stored members, searched within the member's own cube and level
+    rows = rng.integers(0, len(exact), args.queries)
+    queries = exact.embeddings[rows].astype(np.float32) + 0.05 * rng.standard_normal((args.queries, exact.embeddings.shape[1])).astype(np.float32)
+    keys = [(exact.cube_names[row], exact.drilldowns[row]) for row in rows]
+    expected, exact_time = run_queries(exact, queries, keys, args.k)
+
+    print(f"{'mode':<24} {'memory':>10} {'recall@' + str(args.k):>10} {'query':>10}")
+    print(f"{'float32':<24} {exact.nbytes / 2**20:8.1f} MB {1:10.3f} {exact_time:7.2f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_full_precision_embeddings(f"{directory}/full_precision.npy", exact.embeddings)
+        modes = [
+            ("float16", {"quantization": "float16"}),
+            ("int8", {"quantization": "int8"}),
+            ("int8 + mmap rescoring", {"quantization": "int8", "full_precision_path": f"{directory}/full_precision.npy"}),
+        ]
+        for name, index_kwargs in modes:
+            index = build(args, rescore_factor=args.rescore_factor, **index_kwargs)
+            results, query_time = run_queries(index, queries, keys, args.k)
+            recall = np.mean([len(set(result) & set(truth)) / max(len(truth), 1) for result, truth in zip(results, expected)])
+            print(f"{name:<24} {index.nbytes / 2**20:8.1f} MB {recall:10.3f} {query_time:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares memory, recall and latency of the quantized drilldown index against float32.")
+    parser.add_argument("--random", action="store_true", help="Use random embeddings instead of the drilldowns table")
+    parser.add_argument("--members", type=int, default=200000)
+    parser.add_argument("--size", type=int, default=768)
+    parser.add_argument("--levels", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    main(args)
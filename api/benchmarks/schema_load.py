@@ -0,0 +1,37 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+from table_selection.schema_model import load_schema
+
+
+def measure(function, path):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = function(path)
+    elapsed = time.perf_counter() - start_time
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def load_dicts(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def main(path):
+    _, dict_time, dict_memory = measure(load_dicts, path)
+    _, typed_time, typed_memory = measure(load_schema, path)
+
+    print(f"{'json.load (dicts)':<24} {dict_time * 1000:9.1f} ms {dict_memory / 2**20:9.1f} MB resident")
+    print(f"{'load_schema (typed)':<24} {typed_time * 1000:9.1f} ms {typed_memory / 2**20:9.1f} MB resident")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares parse time and resident memory of the raw and typed schema.")
+    parser.add_argument("path", help="Path to a schema.json file")
+    args = parser.parse_args()
+
+    main(args.path)
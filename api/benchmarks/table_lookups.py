@@ -0,0 +1,102 @@
+import argparse
+import time
+
+from table_selection.table import Table, TableManager
+
+
+def synthetic_schema(cubes, dimensions, hierarchies, levels, members):
+    return {"cubes": [{
+        "name": f"cube_{c}",
+        "description": f"Cube {c}",
+        "measures": [{"name": "Trade Value"}],
+        "dimensions": [{
+            "name": f"Dimension {d}",
+            "default_hierarchy": f"Hierarchy {d}.0",
+            "description": "",
+            "hierarchies": [{
+                "name": f"Hierarchy {d}.{h}",
+                "levels": [{
+                    "name": f"Level {d}.{h}.{lvl}",
+                    "unique_name": f"Unique Level {d}.{h}.{lvl}",
+                    "members": [f"Member {m}" for m in range(members)],
+                } for lvl in range(levels)],
+            } for h in range(hierarchies)],
+        } for d in range(dimensions)],
+    } for c in range(cubes)]}
+
+
+def scan_get_table(tables, name):
+    # previous implementation: linear scan over the tables
+    for table in tables:
+        if table.name == name:
+            return table
+    return None
+
+
+def scan_get_drilldown_members(schema, drilldown_name):
+    # previous implementation: walk dimensions, hierarchies and levels
+    for dimension in schema['dimensions']:
+        for hierarchy in dimension['hierarchies']:
+            for level in hierarchy['levels']:
+                level_name = level['unique_name'] if level['unique_name'] is not None else level['name']
+                if level_name == drilldown_name:
+                    return level['members']
+    return []
+
+
+def scan_get_dimension_levels(schema, name):
+    # previous implementation, level and dimension names only
+    for dimension in schema['dimensions']:
+        for hierarchy in dimension['hierarchies']:
+            for level in hierarchy['levels']:
+                if level['name'] == name or level['unique_name'] == name:
+                    return [level['unique_name'] or level['name'] for level in hierarchy['levels']]
+    for dimension in schema['dimensions']:
+        if dimension['name'] == name:
+            return [level['unique_name'] or level['name'] for hierarchy in dimension['hierarchies'] for level in hierarchy['levels']]
+    return []
+
+
+def timed(function, iterations):
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start_time) / iterations * 1e6
+
+
+def report(name, scan_time, indexed_time):
+    print(f"{name:<24} scan {scan_time:9.2f} us   indexed {indexed_time:7.2f} us   {scan_time / indexed_time:8.1f}x")
+
+
+def main(args):
+    schema = synthetic_schema(args.cubes, args.dimensions, args.hierarchies, args.levels, args.members)
+
+    start_time = time.perf_counter()
+    manager = TableManager.__new__(TableManager)
+    manager.tables = [Table(cube) for cube in schema["cubes"]]
+    manager.tables_by_name = {table.name: table for table in manager.tables}
+    print(f"Built {len(manager.tables)} tables with their lookups in {time.perf_counter() - start_time:.2f}s")
+
+    # the last table, dimension and level are the worst case of a scan
+    table_name = manager.tables[-1].name
+    table = manager.tables[-1]
+    raw_schema = schema["cubes"][-1]
+    level_name = table.all_levels[-1]
+    dimension_name = table.dimensions[-1]
+
+    report("get_table", timed(lambda: scan_get_table(manager.tables, table_name), args.iterations), timed(lambda: manager.get_table(table_name), args.iterations))
+    report("get_drilldown_members", timed(lambda: scan_get_drilldown_members(raw_schema, level_name), args.iterations), timed(lambda: table.get_drilldown_members(level_name), args.iterations))
+    report("get_dimension_levels", timed(lambda: scan_get_dimension_levels(raw_schema, dimension_name), args.iterations), timed(lambda: table.get_dimension_levels(dimension_name), args.iterations))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares schema scans with the precomputed lookups of Table and TableManager.")
+    parser.add_argument("--cubes", type=int, default=500)
+    parser.add_argument("--dimensions", type=int, default=10)
+    parser.add_argument("--hierarchies", type=int, default=3)
+    parser.add_argument("--levels", type=int, default=5)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=10000)
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import text as sql_text
+
+from config import POSTGRES_ENGINE
+from utils.vector_queries import match_drilldowns_query, match_table_query
+
+
+def string_match_drilldowns(embedding, cube_name, drilldown_names, threshold=0, content_limit=1, embedding_column='embedding'):
+    """
+    Previous query path: the embedding is formatted into the SQL text and parsed by the server on every call.
+    """
+    drilldown_names_array = "{" + ",".join(map(lambda x: f'"{x}"', drilldown_names)) + "}"
+    query = """select drilldown_id, drilldown_name, drilldown, similarity from "match_drilldowns"('{}','{}' ,'{}','{}','{}', '{}'); """.format(embedding.tolist().__str__(), str(threshold), str(content_limit), str(cube_name), drilldown_names_array, embedding_column)
+
+    with POSTGRES_ENGINE.connect() as connection:
+        return pd.read_sql_query(sql_text(query), connection)
+
+
+def string_match_table(embedding, threshold=0, content_limit=1):
+    """
+    Previous query path for match_table.
+    """
+    query = """select table_name, similarity from "match_table"('{}','{}' ,'{}'); """.format(embedding.tolist().__str__(), str(threshold), str(content_limit))
+
+    with POSTGRES_ENGINE.connect() as connection:
+        return pd.read_sql_query(sql_text(query), connection)
+
+
+def timed(function, vectors, *args):
+    # first call warms up the connection pool and prepares the statements
+    function(vectors[0], *args)
+    timings = []
+    for vector in vectors:
+        start_time = time.perf_counter()
+        function(vector, *args)
+        timings.append(time.perf_counter() - start_time)
+    return np.array(timings) * 1000
+
+
+def report(name, timings):
+    print(f"{name:<32} mean {timings.mean():8.2f} ms   p50 {np.percentile(timings, 50):8.2f} ms   p95 {np.percentile(timings, 95):8.2f} ms")
+
+
+def main(cube_name, drilldown_names, iterations, drilldown_size, table_size):
+    rng = np.random.default_rng(0)
+    drilldown_vectors = rng.standard_normal((iterations, drilldown_size)).astype(np.float32)
+    table_vectors = rng.standard_normal((iterations, table_size)).astype(np.float32)
+
+    report("match_drilldowns (string)", timed(string_match_drilldowns, drilldown_vectors, cube_name, drilldown_names))
+    report("match_drilldowns (bound)", timed(match_drilldowns_query, drilldown_vectors, cube_name, drilldown_names))
+    report("match_table (string)", timed(string_match_table, table_vectors))
+    report("match_table (bound)", timed(match_table_query, table_vectors))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the string and bound parameter paths of the vector similarity queries.")
+    parser.add_argument("--cube", default="trade_i_baci_a_96")
+    parser.add_argument("--levels", nargs="+", default=["Exporter Country", "Importer Country"])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--drilldown-size", type=int, default=768)
+    parser.add_argument("--table-size", type=int, default=384)
+    args = parser.parse_args()
+
+    main(args.cube, args.levels, args.iterations, args.drilldown_size, args.table_size)
@@ -0,0 +1,21 @@
+from config import DRILLDOWN_INDEX_FULL_PRECISION_PATH, DRILLDOWN_INDEX_SOURCE, DRILLDOWNS_TABLE_NAME, POSTGRES_ENGINE, SCHEMA_DRILLDOWNS, TABLES_PATH
+from utils.drilldown_index import DrilldownIndex, write_full_precision_embeddings
+
+embedding_model = "multi-qa-mpnet-base-cos-v1"
+
+def main(path=DRILLDOWN_INDEX_FULL_PRECISION_PATH, source=DRILLDOWN_INDEX_SOURCE):
+    if not path:
+        print("DRILLDOWN_INDEX_FULL_PRECISION_PATH is not set, quantized indexes rescore with their dequantized embeddings")
+        return
+
+    # the rows are built the same way as the index of the API, so they line up with it
+    if source == "schema":
+        index = DrilldownIndex.from_schema(TABLES_PATH, embedding_model)
+    else:
+        index = DrilldownIndex.from_database(POSTGRES_ENGINE, SCHEMA_DRILLDOWNS, DRILLDOWNS_TABLE_NAME, embedding_model)
+
+    write_full_precision_embeddings(path, index.embeddings, index.fingerprint())
+    print(f"Wrote the full precision embeddings of {len(index)} members to {path}")
+
+if __name__ == "__main__":
+    main()
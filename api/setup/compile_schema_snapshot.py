@@ -0,0 +1,26 @@
+import numpy as np
+
+from config import TABLES_PATH
+from table_selection.schema_model import load_schema
+from table_selection.schema_snapshot import get_snapshot_path, write_snapshot
+from utils.encoders import encode
+
+embedding_models = ['multi-qa-MiniLM-L6-cos-v1'] # models used by the in-memory table selection
+
+def compile_description_embeddings(tables_path, models):
+    descriptions = [cube.description or "" for cube in load_schema(tables_path)]
+    embeddings = {}
+    for model in models:
+        vectors = np.asarray(encode(descriptions, model), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        embeddings[model] = vectors / norms
+    return embeddings
+
+def main(tables_path=TABLES_PATH, models=embedding_models):
+    snapshot_path = get_snapshot_path(tables_path)
+    header = write_snapshot(tables_path, snapshot_path, compile_description_embeddings(tables_path, models))
+    print(f"Compiled {tables_path} into {snapshot_path} (format {header['format']}, {len(header['embeddings'])} embedding models)")
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,56 @@
 import json
 import pandas as pd
-import sqlalchemy as db
-import sys
 
-from sentence_transformers import SentenceTransformer
+from sqlalchemy import text as sql_text
 
 from config import POSTGRES_ENGINE, SCHEMA_TABLES, CUBES_TABLE_NAME, TABLES_PATH
+from utils.bulk_loader import BulkLoader
+from utils.content_hash import add_content_hashes, diff_content_hashes, get_existing_hashes
 from utils.similarity_search import embedding
 
 table_name = CUBES_TABLE_NAME
 schema_name = SCHEMA_TABLES
+embedding_model = 'multi-qa-MiniLM-L6-cos-v1'
 embedding_size = 384
+CUBE_COLUMNS = ['table_name', 'table_description', 'embedding', 'content_hash']
+HASH_COLUMNS = ['table_name', 'table_description']
 
 def create_table(table_name, schema_name, embedding_size = 384):
-    POSTGRES_ENGINE.execute(f"CREATE SCHEMA IF NOT EXISTS {schema_name}")
-    POSTGRES_ENGINE.execute(f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} (table_name text, table_description text, embedding vector({embedding_size}))") 
+    with POSTGRES_ENGINE.connect() as conn:
+        conn.execute(sql_text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
+        conn.execute(sql_text(f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} (table_name text, table_description text, embedding vector({embedding_size}), content_hash text)"))
+        conn.execute(sql_text(f"ALTER TABLE {schema_name}.{table_name} ADD COLUMN IF NOT EXISTS content_hash text"))
+        conn.commit()
     return
 
-def load_data_to_db(df, table_name, schema_name):
-    df_embeddings = embedding(df, 'table_description')
-    df_embeddings.to_sql(table_name, con=POSTGRES_ENGINE, if_exists='append', index=False, schema=schema_name)
+def load_data_to_db(df, table_name, schema_name, incremental=True, include_cubes=False):
+    df = add_content_hashes(df, HASH_COLUMNS, embedding_model)
+
+    vanished, unhashed = [], []
+    if incremental:
+        # when only some cubes are loaded, the rows of the other cubes are left as they are
+        filters = {"table_name": list(include_cubes)} if include_cubes else {}
+        existing = get_existing_hashes(POSTGRES_ENGINE, schema_name, table_name, filters)
+        df, vanished = diff_content_hashes(df, existing)
+        # rows loaded before content hashing come back as new, and are replaced by them
+        unhashed = [filters]
+        print(f"{len(df)} new or changed cubes, {len(vanished)} removed")
+
+    df_embeddings = embedding(df, 'table_description', model = embedding_model) if len(df) else df
+    if len(df_embeddings) < len(df):
+        # keep the stored descriptions of the cubes that could not be embedded
+        print(f"{len(df) - len(df_embeddings)} cube descriptions not embedded, keeping their stored rows")
+        vanished, unhashed = [], []
+    with BulkLoader(POSTGRES_ENGINE, schema_name, table_name, CUBE_COLUMNS) as loader:
+        loader.copy(df_embeddings)
+        loader.swap(delete_hashes=vanished, delete_unhashed=unhashed)
     return
 
-def main(include_cubes=False):
+def main(include_cubes=False, incremental=True):
     with open(TABLES_PATH, 'r') as file:
         cubes_json = json.load(file)
 
-    create_table(table_name, schema_name)
+    create_table(table_name, schema_name, embedding_size)
 
     cubes = []
 
@@ -42,13 +66,13 @@ def main(include_cubes=False):
 
     if not include_cubes:
         user_input = input("Are you sure you want to upload all cubes? (y/n): ")
-        if user_input.lower() == 'y':
-            df = pd.DataFrame(cubes)
-            load_data_to_db(df, table_name, schema_name)
-        else:
-            pass
+        if user_input.lower() != 'y':
+            return
+
+    df = pd.DataFrame(cubes)
+    load_data_to_db(df, table_name, schema_name, incremental, include_cubes)
 
 if __name__ == "__main__":
     include_cubes = False # if set to False it will ingest all the cubes in the schema.json
-    main(include_cubes)
-
+    incremental = True # only embed new or changed cube descriptions, based on their content hash
+    main(include_cubes, incremental)
@@ -1,27 +1,40 @@
 import json
 import pandas as pd
-import requests
+import queue
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from config import POSTGRES_ENGINE, SCHEMA_DRILLDOWNS, TESSERACT_API, TABLES_PATH
+from utils.bulk_loader import BulkLoader
+from utils.content_hash import add_content_hashes, diff_content_hashes, get_existing_hashes
 from utils.similarity_search import embedding
+from utils.tesseract_client import get_tesseract_client
 from sqlalchemy import text as sql_text
 
 embedding_model = "multi-qa-mpnet-base-cos-v1"
 embedding_size = 768
 DRILLDOWNS_TABLE_NAME = "drilldowns"
+DRILLDOWN_COLUMNS = ['drilldown_id', 'drilldown_name', 'cube_name', 'drilldown', 'embedding', 'content_hash']
+HASH_COLUMNS = ['cube_name', 'drilldown', 'drilldown_id', 'drilldown_name']
 
 def create_table(table_name=DRILLDOWNS_TABLE_NAME, schema_name=SCHEMA_DRILLDOWNS, embedding_size=embedding_size):
     query_schema = f"CREATE SCHEMA IF NOT EXISTS {schema_name}"
-    query_table = f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} (drilldown_id text, drilldown_name text, cube_name text, drilldown text, embedding vector({embedding_size}))"
+    query_table = f"CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} (drilldown_id text, drilldown_name text, cube_name text, drilldown text, embedding vector({embedding_size}), content_hash text)"
+    query_hash_column = f"ALTER TABLE {schema_name}.{table_name} ADD COLUMN IF NOT EXISTS content_hash text"
+    query_hash_index = f"CREATE INDEX IF NOT EXISTS {table_name}_content_hash_idx ON {schema_name}.{table_name} (cube_name, drilldown, content_hash)"
     
     with POSTGRES_ENGINE.connect() as conn:
             conn.execute(sql_text(query_schema))
             conn.execute(sql_text(query_table))
+            conn.execute(sql_text(query_hash_column))
+            conn.execute(sql_text(query_hash_index))
             conn.commit()
 
 def get_data_from_api(api_url):
     try:
-        r = requests.get(api_url)
+        r = get_tesseract_client().get(api_url)
         df = pd.DataFrame.from_dict(r.json()['data'])
     except Exception as e:
         raise ValueError(f"Error fetching data from API: {e}")
@@ -45,50 +58,195 @@ def prepare_dataframe(df, measure_name, cube_name, drilldown_name, drilldown_uni
     print(df.head())
     return df
 
-def load_data_to_db(api_url, measure_name, cube_name, drilldown_name, drilldown_unique_name=None, schema_name=SCHEMA_DRILLDOWNS, db_table_name=DRILLDOWNS_TABLE_NAME):
+def level_scope(cube_name, drilldown_name, drilldown_unique_name=None):
+    return {"cube_name": cube_name, "drilldown": drilldown_unique_name if drilldown_unique_name else drilldown_name}
+
+def prepare_level(api_url, measure_name, cube_name, drilldown_name, drilldown_unique_name=None, incremental=False, schema_name=SCHEMA_DRILLDOWNS, db_table_name=DRILLDOWNS_TABLE_NAME):
+    """
+    Fetches the members of a level and hashes them. In incremental mode, only the new or changed members are kept,
+    along with the hashes of the stored members that are no longer in the API.
+    """
     df = get_data_from_api(api_url)
     df = prepare_dataframe(df, measure_name, cube_name, drilldown_name, drilldown_unique_name)
-    df_embeddings = embedding(df, 'drilldown_name', model = embedding_model)
-    df_embeddings.to_sql(db_table_name, con=POSTGRES_ENGINE, if_exists='append', index=False, schema=schema_name)
+    df = add_content_hashes(df, HASH_COLUMNS, embedding_model)
+
+    if not incremental:
+        return df, []
+
+    existing = get_existing_hashes(POSTGRES_ENGINE, schema_name, db_table_name, level_scope(cube_name, drilldown_name, drilldown_unique_name))
+    changed, vanished = diff_content_hashes(df, existing)
+    print(f"{cube_name} - {drilldown_name}: {len(changed)} new or changed, {len(vanished)} removed, {len(df) - len(changed)} unchanged")
+    return changed, vanished
+
+def load_data_to_db(api_url, measure_name, cube_name, drilldown_name, drilldown_unique_name=None, schema_name=SCHEMA_DRILLDOWNS, db_table_name=DRILLDOWNS_TABLE_NAME, loader=None, incremental=False):
+    """
+    Loads the members of a level. In incremental mode, returns the hashes and the scope of the stored rows to delete
+    with the swap, which are left empty if some members could not be embedded.
+    """
+    df, vanished = prepare_level(api_url, measure_name, cube_name, drilldown_name, drilldown_unique_name, incremental, schema_name, db_table_name)
+    df_embeddings = embedding(df, 'drilldown_name', model = embedding_model) if len(df) else df
+
+    # the stored rows of a level are only deleted once every fresh member of the level is loaded
+    complete = len(df_embeddings) == len(df)
+    if not complete:
+        print(f"{cube_name} - {drilldown_name}: {len(df) - len(df_embeddings)} members not embedded, keeping its stored rows")
+    vanished = vanished if complete else []
+    unhashed = [level_scope(cube_name, drilldown_name, drilldown_unique_name)] if incremental and complete else []
+
+    if loader is None:
+        with BulkLoader(POSTGRES_ENGINE, schema_name, db_table_name, DRILLDOWN_COLUMNS) as loader:
+            loader.copy(df_embeddings)
+            loader.swap(delete_hashes=vanished, delete_unhashed=unhashed)
+    else:
+        loader.copy(df_embeddings)
 
-def main(include_cubes=False):
+    return vanished, unhashed
+
+def get_level_jobs(cubes_json, include_cubes=False):
+    """
+    Lists the arguments of load_data_to_db for every level of every cube to ingest.
+    """
+    jobs = []
+    for table in cubes_json['cubes']:
+        cube_name = table['name']
+        if include_cubes and cube_name not in include_cubes:
+            continue
+        measure = table['measures'][0]['name']
+        for dimension in table['dimensions']:
+            for hierarchy in dimension['hierarchies']:
+                for level in hierarchy['levels']:
+                    drilldown_name = level['name']
+                    drilldown_unique_name = level.get('unique_name')
+                    api_url = f"{TESSERACT_API}data.jsonrecords?cube={cube_name}&drilldowns={level['unique_name'] if drilldown_unique_name is not None else drilldown_name}&measures={measure}"
+                    jobs.append((api_url, measure, cube_name, drilldown_name, drilldown_unique_name))
+    return jobs
+
+def load_levels_pipelined(jobs, loader, fetch_workers=8, queue_size=4, incremental=False):
+    """
+    Ingests the levels in three overlapping stages: a pool of threads fetching members from the API,
+    one thread computing embeddings and one thread copying them to the staging table of the loader.
+    Bounded queues between stages keep at most queue_size levels waiting on each stage.
+    Returns the levels that failed, and for the levels loaded in full the hashes of the members that vanished from the API
+    and, in incremental mode, the scopes whose rows without a hash are replaced.
+    """
+    encode_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    done = object()
+    failed = []
+
+    vanished = {}
+
+    def fetch(job):
+        df, vanished[job] = prepare_level(*job, incremental=incremental)
+        return df
+
+    def encode_stage():
+        while True:
+            item = encode_queue.get()
+            if item is done:
+                write_queue.put(done)
+                return
+            job, df = item
+            if df.empty:
+                continue
+            try:
+                df_embeddings = embedding(df, 'drilldown_name', model = embedding_model)
+            except Exception as e:
+                print(f"Error embedding {job[2]} - {job[3]}: {e}")
+                failed.append(job)
+                continue
+            if len(df_embeddings) < len(df):
+                # the embedded members are still loaded, but the level keeps its stored rows
+                print(f"Error embedding {len(df) - len(df_embeddings)} members of {job[2]} - {job[3]}")
+                failed.append(job)
+            write_queue.put((job, df_embeddings))
+
+    def write_stage():
+        while True:
+            item = write_queue.get()
+            if item is done:
+                return
+            job, df = item
+            try:
+                loader.copy(df)
+                print(f"Loaded {len(df)} members of {job[2]} - {job[3]}")
+            except Exception as e:
+                print(f"Error writing {job[2]} - {job[3]}: {e}")
+                failed.append(job)
+
+    encoder = threading.Thread(target=encode_stage)
+    writer = threading.Thread(target=write_stage)
+    encoder.start()
+    writer.start()
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+        pending_jobs = list(jobs)
+        futures = {}
+        while pending_jobs or futures:
+            # only fetch_workers levels in flight, so fetched members do not pile up while encoding is behind
+            while pending_jobs and len(futures) < fetch_workers:
+                job = pending_jobs.pop(0)
+                futures[executor.submit(fetch, job)] = job
+
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = futures.pop(future)
+                try:
+                    encode_queue.put((job, future.result()))
+                except Exception as e:
+                    print(f"Error fetching {job[2]} - {job[3]}: {e}")
+                    failed.append(job)
+
+    encode_queue.put(done)
+    encoder.join()
+    writer.join()
+
+    print(f"Loaded {len(jobs) - len(failed)} of {len(jobs)} levels in {time.time() - start_time:.1f}s")
+    # deleting stored rows of a level that did not load in full would lose its members
+    loaded = [job for job in jobs if job in vanished and job not in failed]
+    unhashed = [level_scope(*job[2:5]) for job in loaded] if incremental else []
+    return failed, [value for job in loaded for value in vanished[job]], unhashed
+
+def main(include_cubes=False, fetch_workers=8, replace_existing=False, incremental=True):
     with open(TABLES_PATH, 'r') as file:
         cubes_json = json.load(file)
 
     if not include_cubes:
         user_input = input("Are you sure you want to upload all cubes? (y/n): ")
-        if user_input.lower() == 'y':
-            create_table()
-
-            for table in cubes_json['cubes']:
-                cube_name = table['name']
-                measure = table['measures'][0]['name']
-                for dimension in table['dimensions']:
-                    for hierarchy in dimension['hierarchies']:
-                        for level in hierarchy['levels']:
-                            drilldown_name = level['name']
-                            drilldown_unique_name = level.get('unique_name')
-                            api_url = f"{TESSERACT_API}data.jsonrecords?cube={cube_name}&drilldowns={level['unique_name'] if drilldown_unique_name is not None else drilldown_name}&measures={measure}"
-                            load_data_to_db(api_url, measure, cube_name, drilldown_name, drilldown_unique_name)
-        else: 
-            pass
-
-    else: 
-        create_table()
-
-        for table in cubes_json['cubes']:
-            cube_name = table['name']
-            if include_cubes and cube_name not in include_cubes:
-                continue
-            measure = table['measures'][0]['name']
-            for dimension in table['dimensions']:
-                for hierarchy in dimension['hierarchies']:
-                    for level in hierarchy['levels']:
-                        drilldown_name = level['name']
-                        drilldown_unique_name = level.get('unique_name')
-                        api_url = f"{TESSERACT_API}data.jsonrecords?cube={cube_name}&drilldowns={level['unique_name'] if drilldown_unique_name is not None else drilldown_name}&measures={measure}"
-                        load_data_to_db(api_url, measure, cube_name, drilldown_name, drilldown_unique_name)
+        if user_input.lower() != 'y':
+            return
+
+    create_table()
+
+    # replacing the cubes re-embeds every member, so there is nothing to compare against
+    incremental = incremental and not replace_existing
+
+    jobs = get_level_jobs(cubes_json, include_cubes)
+
+    # the staging table is dropped if the load is interrupted before the swap
+    with BulkLoader(POSTGRES_ENGINE, SCHEMA_DRILLDOWNS, DRILLDOWNS_TABLE_NAME, DRILLDOWN_COLUMNS) as loader:
+        if fetch_workers > 1:
+            failed, vanished, unhashed = load_levels_pipelined(jobs, loader, fetch_workers, incremental=incremental)
+        else:
+            vanished, unhashed = [], []
+            for job in jobs:
+                try:
+                    level_vanished, level_unhashed = load_data_to_db(*job, loader=loader, incremental=incremental)
+                except Exception as e:
+                    print(f"Error loading {job[2]} - {job[3]}: {e}")
+                    continue
+                vanished.extend(level_vanished)
+                unhashed.extend(level_unhashed)
+
+        # the new members only become visible once every level is loaded,
+        # replacing the rows loaded before content hashing in the same transaction
+        replace_cubes = sorted({job[2] for job in jobs}) if replace_existing else None
+        loader.swap(replace_cubes=replace_cubes, delete_hashes=vanished, delete_unhashed=unhashed)
 
 if __name__ == "__main__":
     include_cubes = ['trade_i_baci_a_92', 'trade_i_baci_a_22'] # if set to False it will upload the drilldowns of all cubes in the schema.json
-    main(include_cubes)
\ No newline at end of file
+    fetch_workers = 8 # levels fetched in parallel, set to 1 to load the levels one by one
+    replace_existing = False # if set to True the current members of the ingested cubes are replaced instead of appended to
+    incremental = True # only embed new or changed members and delete the vanished ones, based on their content hash
+    main(include_cubes, fetch_workers, replace_existing, incremental)
@@ -4,4 +4,6 @@ python schema_to_json.py
 
 python load_cubes_to_db.py
 
-python load_drilldowns_to_db.py
\ No newline at end of file
+python load_drilldowns_to_db.py
+
+python build_drilldown_index.py
\ No newline at end of file
@@ -1,9 +1,13 @@
 import json
+import os
 import time
 
 import xml.etree.ElementTree as ET
 
+import compile_schema_snapshot
+
 from utils.functions import request_to_tesseract
+from utils.member_store import get_members_path, write_member_store
 from config import DATA_PATH, DESCRIPTIONS_PATH, TESSERACT_API, TESSERACT_API_SECRET
 
 
@@ -125,6 +129,8 @@ def add_extra_entries(schema_json, custom_descriptions=None):
                     members = get_members(cube["name"], level["name"])
                     members_list = [member[get_member_key(member)] for member in members]
                     level["members"] = members_list
+                    # ids aligned with the members, so cuts can be resolved without a similarity search
+                    level["member_ids"] = [member.get("ID", member[get_member_key(member)]) for member in members]
         for measure in cube["measures"]:
             # measure["description"] = measures.get(measure["name"], "")
             measure["description"] = measure.get("description", descriptions["measures"].get(measure["name"], ""))
@@ -132,24 +138,38 @@ def add_extra_entries(schema_json, custom_descriptions=None):
     return schema_json
 
 
-def parse_html_cubes_to_json(endpoint, json_file):
+def parse_html_cubes_to_json(endpoint, json_file, inline_members=False):
     """
     Download the latest cubes endpoint from tesseract and saves the request as a json.
+    Unless inline_members is set, the members of the levels are saved in a side file next to the json
+    (e.g. schema_members.bin), so the json only holds metadata.
     """
     r = request_to_tesseract(endpoint, TESSERACT_API_SECRET)
     schema = r.json()
     schema = add_extra_entries(r.json(), custom_descriptions=True)
 
+    members_path = get_members_path(DATA_PATH + json_file)
+    if not inline_members:
+        schema = write_member_store(schema, members_path)
+    elif os.path.exists(members_path):
+        # a stale side file would be picked up by the api
+        os.remove(members_path)
+
     with open(DATA_PATH + json_file, "w") as f:
         json.dump(schema, f, indent=4)
 
 
-def main(json_file):
+def main(json_file, inline_members=False, compile_snapshot=True):
     endpoint = TESSERACT_API + "cubes"
-    parse_html_cubes_to_json(endpoint, json_file)
+    parse_html_cubes_to_json(endpoint, json_file, inline_members)
+
+    if compile_snapshot:
+        compile_schema_snapshot.main(DATA_PATH + json_file)
 
 
 if __name__ == "__main__":
     json_file = "schema.json"
+    inline_members = False # if set to True the members are kept inside schema.json instead of schema_members.bin
+    compile_snapshot = True # if set to True the schema, members and table embeddings are also compiled into schema.snapshot
     
-    main(json_file)
\ No newline at end of file
+    main(json_file, inline_members, compile_snapshot)
\ No newline at end of file
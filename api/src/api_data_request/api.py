@@ -1,12 +1,58 @@
 import pandas as pd
-import requests
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Tuple, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any
 
-from config import TESSERACT_API
+from config import TESSERACT_API, TESSERACT_RESPONSE_FORMAT, TESSERACT_TIME_RANGES, QUERY_MAX_ROWS, QUERY_OVERSIZE_STRATEGY
+from api_data_request.columnar import dataframe_to_records, decode_response, get_response_format, with_response_format
+from api_data_request.query_cost import QueryCost, preflight
+from api_data_request.member_resolver import get_member_resolver
 from table_selection.table import Table
-from utils.similarity_search import get_similar_content
+from utils.response_cache import get_response_cache
+from utils.similarity_search import get_similar_contents
+from utils.tesseract_client import get_tesseract_client
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """
+    Canonical, hashable form of an API query. Cuts, cut values, drilldowns and measures are sorted,
+    so the same logical query always gives the same spec and the same URL.
+    """
+    cube: str
+    cuts: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+    time: Optional[str] = None
+    drilldowns: Tuple[str, ...] = ("Year",)
+    measures: Tuple[str, ...] = ()
+    limit: Optional[str] = None
+    sort: Optional[str] = None
+    locale: Optional[str] = None
+
+    def to_query_string(self) -> str:
+        """
+        Builds the query string of the spec, with the parameters in a fixed order.
+
+        Returns:
+            str: The query string, without the leading "?".
+        """
+        query_params = []
+        if self.cube:
+            query_params.append(f"cube={self.cube}")
+        for key, values in self.cuts:
+            query_params.append(f"{key}={','.join(values)}")
+        if self.time:
+            query_params.append(f"time={self.time}")
+        query_params.append("drilldowns=" + ",".join(self.drilldowns))
+        if self.measures:
+            query_params.append("measures=" + ",".join(self.measures))
+        if self.limit is not None:
+            query_params.append(f"limit={self.limit}")
+        if self.sort:
+            query_params.append(f"sort={self.sort}")
+        if self.locale:
+            query_params.append(f"locale={self.locale}")
+        return "&".join(query_params)
+
 
 class ApiBuilder:
 
@@ -19,25 +65,33 @@ class ApiBuilder:
             cuts: List[str] = None,
             limit: str = None,
             form_json: Dict = None, 
+            response_format: str = TESSERACT_RESPONSE_FORMAT,
             ):
         """
         Initializes the ApiBuilder.
 
         Args:
-            base_url (str): The base URL for the API.
+            base_url (str): The base URL for the API, as returned to clients.
             table (Table): The table.
             drilldowns (List[str]): List of drilldowns.
             measures (List[str]): List of measures.
             cuts (List[str]): List of cuts.
             limit (str): The limit of the response.
             form_json (Dict): JSON data for initialization.
+            response_format (str): Format fetched by the API itself: jsonarrays, csv or jsonrecords. Defaults to TESSERACT_RESPONSE_FORMAT.
         """
         self.base_url = base_url
+        self.response_format = response_format
+        self.table = table
         self.cube = table.name
+        self.data_version = getattr(table, "data_version", "")
+        self.cost = None
         self.cuts = {}
         self.cuts_context = {}
         self.drilldowns = set()
         self.measures = set()
+        self.time = None
+        self.no_data = None
         self.limit = None
         self.sort = None
         self.locale = None
@@ -57,7 +111,7 @@ class ApiBuilder:
                 if measures:
                     self.add_measure(measures)
                 else: 
-                    self.measures = table.measures
+                    self.measures = set(table.measures)
 
                 if cuts:
                     cuts_processing(cuts, table, self)
@@ -145,62 +199,115 @@ class ApiBuilder:
         """
         self.from_json(json_data)
 
-    def build_api(self) -> str:
+    def query_spec(self) -> QuerySpec:
         """
-        Builds the API request URL.
+        Freezes the current state of the builder into its canonical QuerySpec.
 
         Returns:
-            str: The API request URL.
+            QuerySpec: The canonical query.
         """
-        query_params = []
-
         if 'Trade Value' in self.measures:
             self.set_sort('Trade Value', 'desc')
         elif 'Quantity' in self.measures:
             self.set_sort('Quantity', 'desc')
 
-        if self.cube:
-            query_params.append(f"cube={self.cube}")
-        for key, values in self.cuts.items():
-            query_params.append(f"{key}={','.join(values)}")
-        
-        if self.drilldowns:
-            query_params.append("drilldowns=" + ",".join(self.drilldowns))
-        else: 
-            query_params.append("drilldowns=Year")
+        return QuerySpec(
+            cube=self.cube,
+            cuts=tuple((key, tuple(sorted(values))) for key, values in sorted(self.cuts.items())),
+            time=self.time,
+            drilldowns=tuple(sorted(self.drilldowns)) or ("Year",),
+            measures=tuple(sorted(self.measures)),
+            limit=self.limit,
+            sort=self.sort,
+            locale=self.locale,
+        )
+
+    def preflight(self, max_rows: int = QUERY_MAX_ROWS, strategy: str = QUERY_OVERSIZE_STRATEGY) -> QueryCost:
+        """
+        Estimates the number of rows of the query from the schema, and adds a limit, coarsens the drilldowns
+        or rejects the query if it exceeds max_rows. Call it before build_api, as it may change the query.
 
-        if self.measures:
-            query_params.append("measures=" + ",".join(self.measures))
-        if self.limit is not None:
-            query_params.append(f"limit={self.limit}")
-        if self.sort:
-            query_params.append(f"sort={self.sort}")
-        if self.locale:
-            query_params.append(f"locale={self.locale}")
+        Args:
+            max_rows (int, optional): Maximum number of rows to fetch. Defaults to QUERY_MAX_ROWS.
+            strategy (str, optional): "limit", "coarsen" or "reject". Defaults to QUERY_OVERSIZE_STRATEGY.
 
-        query_string = "&".join(query_params)
-        return f"{self.base_url}{query_string}" if query_params else self.base_url
+        Returns:
+            QueryCost: The estimate and the action taken.
+        """
+        self.cost = preflight(self, self.table, max_rows, strategy)
+        if self.cost.action != "ok":
+            print(self.cost.message)
+        return self.cost
 
-    def fetch_data(self) -> Tuple[Dict[str, Any], pd.DataFrame, str]:
+    def build_api(self) -> str:
         """
-        Makes an API request and returns the JSON data and a DataFrame.
+        Builds the API request URL. The URL is canonical: the same query gives the same URL in every process.
 
         Returns:
-            Tuple[Dict[str, Any], pd.DataFrame, str]: JSON data, DataFrame, and error message (if any).
+            str: The API request URL.
+        """
+        return f"{self.base_url}{self.query_spec().to_query_string()}"
+
+    def fetch_url(self) -> str:
+        """
+        Builds the URL the API fetches itself, in the columnar response format.
+        build_api keeps the format of base_url, as that URL is handed to clients that expect records.
+
+        Returns:
+            str: The API request URL in the response format of the builder.
+        """
+        return with_response_format(self.build_api(), self.response_format)
+
+    def fetch_dataframe(self) -> Tuple[pd.DataFrame, str]:
+        """
+        Makes an API request and decodes the response once into a DataFrame.
+        Responses are served from the response cache while they are fresh and the cube's data has not changed.
+
+        Returns:
+            Tuple[pd.DataFrame, str]: DataFrame, and error message (if any).
         """
         try:
-            r = requests.get(self.build_api())
+            if self.no_data:
+                return pd.DataFrame(), self.no_data
+
+            cost = self.cost or self.preflight()
+            if cost.action == "rejected":
+                return pd.DataFrame(), cost.message
+
+            # the canonical URL doubles as the cache key
+            url = self.fetch_url()
+            response_format = get_response_format(url)
+            cache = get_response_cache()
+            body = cache.get(url, self.data_version) if cache is not None else None
+
+            if body is not None:
+                return decode_response(body, response_format), ""
+
+            r = get_tesseract_client().get(url)
             r.raise_for_status()
+            df = decode_response(r.content, response_format)
+            if df is None:
+                return pd.DataFrame(), "No data key in response."
 
-            if 'data' in r.json():
-                json_data = r.json()['data']
-                df = pd.DataFrame.from_dict(json_data)
-                return json_data, df, ""
-            else:
-                return {}, pd.DataFrame(), "No data key in response."
+            if cache is not None:
+                cache.set(url, r.content, self.data_version)
+            return df, ""
 
         except Exception as e:
-            return {}, pd.DataFrame(), f"An error occurred: {str(e)}"
+            return pd.DataFrame(), f"An error occurred: {str(e)}"
+
+    def fetch_data(self) -> Tuple[List[Dict[str, Any]], pd.DataFrame, str]:
+        """
+        Makes an API request and returns the JSON data and a DataFrame.
+        Prefer fetch_dataframe when the records are not needed, as they hold a second copy of the data.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], pd.DataFrame, str]: JSON data, DataFrame, and error message (if any).
+        """
+        df, error = self.fetch_dataframe()
+        if error:
+            return {}, df, error
+        return dataframe_to_records(df), df, ""
 
     def __str__(self):
         return self.build_api()
@@ -225,41 +332,34 @@ def cuts_processing(cuts: List[str], table: Table, api: ApiBuilder):
         else:
             other_cuts.append(cut)
 
-    # Process year cuts separately
-    year_range = None
+    # Process year cuts separately, an open end stays None until the range is added
+    start_year, end_year = None, None
+    has_range = False
     for cut in year_cuts:
         if 'All' in cut or 'all' in cut:
             api.add_drilldown('Year')
-        elif ">=" in cut:
-            start_year = int(cut.split('>=')[1].strip())
-            if year_range:
-                year_range = (max(year_range[0], start_year), year_range[1])
-            else:
-                year_range = (start_year, datetime.now().year)
+            continue
+        has_range = True
+        if ">=" in cut:
+            start, end = int(cut.split('>=')[1].strip()), None
         elif "<=" in cut:
-            end_year = int(cut.split('<=')[1].strip())
-            if year_range:
-                year_range = (year_range[0], min(year_range[1], end_year))
-            else:
-                year_range = (1970, end_year)
+            start, end = None, int(cut.split('<=')[1].strip())
         elif "-" in cut:
-            start_year, end_year = map(int, cut.split('=')[1].strip().split('-'))
-            if year_range:
-                year_range = (max(year_range[0], start_year), min(year_range[1], end_year))
-            else:
-                year_range = (start_year, end_year)
+            start, end = map(int, cut.split('=')[1].strip().split('-'))
         else:
-            year = int(cut.split('=')[1].strip())
-            if year_range:
-                year_range = (max(year_range[0], year), min(year_range[1], year))
-            else:
-                year_range = (year, year)
-
-    if year_range:
-        for year in range(min(year_range), max(year_range) + 1):
-            api.add_cut("Year", str(year), str(year))
-
-    # Process other cuts
+            start = end = int(cut.split('=')[1].strip())
+        if start is not None:
+            start_year = start if start_year is None else max(start_year, start)
+        if end is not None:
+            end_year = end if end_year is None else min(end_year, end)
+
+    if has_range:
+        add_year_range(api, table, start_year, end_year)
+
+    # Process other cuts, resolving members by name first and leaving the rest for the similarity search
+    resolver = get_member_resolver(table)
+    resolved_cuts = []
+    similarity_cuts = []
     for cut in other_cuts:
         var = cut.split('=')[0].strip()
         cut = cut.split('=')[1].strip()
@@ -274,13 +374,29 @@ def cuts_processing(cuts: List[str], table: Table, api: ApiBuilder):
             if var == "Year" or var == "Month" or var == "Quarter" or var == "Month and Year" or var == "Time":
                 api.add_cut(var, cut, cut)
             else:
-                drilldown_id, drilldown, s, drilldown_name = get_similar_content(cut, table.name, var_levels)
+                match = resolver.resolve(cut, var_levels)
+                if match:
+                    resolved_cuts.append((var, cut, var_levels, match))
+                else:
+                    similarity_cuts.append((var, cut, var_levels))
+
+    # Match the remaining cuts to their ids in a single batch
+    matches = get_similar_contents([cut for _, cut, _ in similarity_cuts], table.name, [var_levels for _, _, var_levels in similarity_cuts])
 
-                if drilldown != var:
-                    api.drilldowns.discard(var)
-                    api.add_drilldown(drilldown)
+    matched_cuts = resolved_cuts + [(var, cut, var_levels, match) for (var, cut, var_levels), match in zip(similarity_cuts, matches)]
 
-                api.add_cut(drilldown, drilldown_id, drilldown_name)
+    for var, cut, var_levels, match in matched_cuts:
+        if match is None:
+            print(f"No match found for cut '{var} = {cut}'")
+            continue
+
+        drilldown_id, drilldown, s, drilldown_name = match
+
+        if drilldown != var:
+            api.drilldowns.discard(var)
+            api.add_drilldown(drilldown)
+
+        api.add_cut(drilldown, drilldown_id, drilldown_name)
 
     for cut, values in api.cuts.items():
         if len(values) > 1:
@@ -288,4 +404,56 @@ def cuts_processing(cuts: List[str], table: Table, api: ApiBuilder):
         # elif "HS" in cut:
         #     api.add_drilldown(cut)
         else: 
-            api.drilldowns.discard(cut)
\ No newline at end of file
+            api.drilldowns.discard(cut)
+
+def add_year_range(api: ApiBuilder, table: Table, start_year: Optional[int], end_year: Optional[int], time_ranges: bool = TESSERACT_TIME_RANGES):
+    """
+    Adds a year range to the API request, clamped to the years available in the table.
+    A range covering every year of the table needs no cut, and with time_ranges a range ending at the latest year
+    is sent as a Tesseract time filter. Otherwise each year of the range is cut.
+    A range with none of the years of the table, or whose start is after its end, marks the request as having no data.
+
+    Args:
+        api (ApiBuilder): The ApiBuilder instance.
+        table (Table): The table.
+        start_year (Optional[int]): First year of the range, None for the first year of the table.
+        end_year (Optional[int]): Last year of the range, None for the last year of the table.
+        time_ranges (bool, optional): Whether to use the time filter. Defaults to TESSERACT_TIME_RANGES.
+    """
+    if start_year is None and end_year is None:
+        return
+
+    if start_year is None:
+        requested = f"up to {end_year}"
+        start_year = table.years[0] if table.years else 1970
+    elif end_year is None:
+        requested = f"from {start_year}"
+        end_year = table.years[-1] if table.years else datetime.now().year
+    else:
+        requested = f"{start_year}-{end_year}" if start_year != end_year else str(start_year)
+
+    if start_year > end_year:
+        available = f", the table has data for {table.years[0]}-{table.years[-1]}" if table.years else ""
+        api.no_data = f"No data for the years {requested}{available}."
+        api.cuts_context.setdefault("Year", set()).add(requested)
+        return
+
+    # without the years of the table the range is cut as asked
+    years = list(range(start_year, end_year + 1))
+    if table.years:
+        years = [year for year in table.years if start_year <= year <= end_year]
+        if not years:
+            api.no_data = f"No data for the years {requested}, the table has data for {table.years[0]}-{table.years[-1]}."
+            api.cuts_context.setdefault("Year", set()).add(requested)
+            return
+
+    if len(years) > 1 and (years == table.years or (time_ranges and years == table.years[-len(years):])):
+        if years != table.years:
+            api.time = f"Year.latest.{len(years)}"
+        api.add_drilldown("Year")
+        # no cut is sent, the context still tells which years were asked for
+        api.cuts_context.setdefault("Year", set()).add(f"{years[0]}-{years[-1]}")
+        return
+
+    for year in years:
+        api.add_cut("Year", str(year), str(year))
@@ -0,0 +1,75 @@
+import io
+
+import orjson
+import pandas as pd
+
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+RESPONSE_FORMATS = ("jsonarrays", "csv", "jsonrecords")
+
+
+def get_response_format(url: str) -> str:
+    """
+    Returns the response format requested by a Tesseract URL, from the extension of its data endpoint, e.g. data.csv -> csv.
+    """
+    extension = urlparse(url).path.rsplit(".", 1)[-1]
+    return extension if extension in RESPONSE_FORMATS else "jsonrecords"
+
+
+def with_response_format(url: str, response_format: str) -> str:
+    """
+    Points a Tesseract URL to the data endpoint of another response format, e.g. data.jsonrecords -> data.jsonarrays.
+    URLs whose endpoint has no known format extension are returned unchanged.
+    """
+    parts = urlparse(url)
+    path, _, extension = parts.path.rpartition(".")
+    if extension not in RESPONSE_FORMATS or response_format not in RESPONSE_FORMATS:
+        return url
+    return parts._replace(path=f"{path}.{response_format}").geturl()
+
+
+def decode_response(body: bytes, response_format: str) -> Optional[pd.DataFrame]:
+    """
+    Decodes a Tesseract response body into a DataFrame in a single pass.
+    CSV is parsed straight into typed columns, and JSON arrays are loaded as rows without building a dict per record.
+
+    Args:
+        body (bytes): The response body.
+        response_format (str): One of "jsonarrays", "csv" or "jsonrecords".
+
+    Returns:
+        Optional[pd.DataFrame]: The data of the response, or None if a JSON response has no data key.
+    """
+    if response_format == "csv":
+        if not body.strip():
+            return pd.DataFrame()
+        return pd.read_csv(io.BytesIO(body))
+
+    response = orjson.loads(body)
+    if not isinstance(response, dict) or 'data' not in response:
+        return None
+
+    if response_format == "jsonarrays":
+        return pd.DataFrame(response['data'], columns=response.get('columns'))
+    return pd.DataFrame.from_records(response['data'])
+
+
+def dataframe_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Materializes the rows of a DataFrame as records, as in a jsonrecords response, with missing values as None.
+
+    Args:
+        df (pd.DataFrame): The data.
+
+    Returns:
+        List[Dict[str, Any]]: One dict per row.
+    """
+    records = df.to_dict(orient="records")
+    null_columns = [column for column in df.columns if df[column].hasnans]
+    if null_columns:
+        for record in records:
+            for column in null_columns:
+                if pd.isna(record[column]):
+                    record[column] = None
+    return records
@@ -0,0 +1,173 @@
+import difflib
+import json
+import re
+import unicodedata
+
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import ALIASES_PATH
+from table_selection.table import Table
+
+
+def normalize_member(text: str) -> str:
+    """
+    Normalizes a member name for exact and fuzzy matching: no accents, no punctuation, casefolded.
+
+    Args:
+        text (str): The member name.
+
+    Returns:
+        str: The normalized name.
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", "", text.casefold())
+    return " ".join(text.split())
+
+
+def trigrams(key: str) -> Set[str]:
+    """
+    Splits a normalized name into its character trigrams, padded so short names and word starts count too.
+
+    Args:
+        key (str): The normalized name.
+
+    Returns:
+        Set[str]: The trigrams of the name.
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_aliases(aliases_path: str = ALIASES_PATH) -> Dict[str, str]:
+    """
+    Loads the curated alias table, keyed by normalized alias.
+
+    Args:
+        aliases_path (str): The path to the aliases JSON file.
+
+    Returns:
+        Dict[str, str]: Canonical member name for each normalized alias.
+    """
+    try:
+        with open(aliases_path, "r") as file:
+            aliases = json.load(file).get("aliases", {})
+    except FileNotFoundError:
+        return {}
+
+    return {normalize_member(alias): name for alias, name in aliases.items()}
+
+
+class MemberResolver:
+    """
+    Resolves cut values to member ids of a table without embeddings: exact match, then alias, then fuzzy match.
+    Fuzzy matches are looked up in a trigram index of the member names, so only the closest candidates are scored.
+    """
+    def __init__(self, table: Table, aliases: Dict[str, str] = None, fuzzy_cutoff: float = 0.9, fuzzy_candidates: int = 10):
+        """
+        Initializes the MemberResolver.
+
+        Args:
+            table (Table): The table whose members are matched.
+            aliases (Dict[str, str], optional): Canonical member name for each normalized alias. Defaults to the curated alias table.
+            fuzzy_cutoff (float, optional): Minimum similarity ratio of a fuzzy match. Defaults to 0.9.
+            fuzzy_candidates (int, optional): Members sharing the most trigrams with the value that are scored per level. Defaults to 10.
+        """
+        self.table = table
+        self.aliases = load_aliases() if aliases is None else aliases
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.fuzzy_candidates = fuzzy_candidates
+        self.members: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self.trigrams: Dict[str, Dict[str, List[str]]] = {}
+
+    def _level_index(self, level: str) -> Dict[str, Tuple[str, str]]:
+        # built on first use, most cuts only touch one or two levels of the table
+        if level not in self.members:
+            index = {}
+            names = self.table.get_drilldown_members(level)
+            ids = self.table.get_drilldown_member_ids(level)
+            if len(ids) == len(names):
+                for member_id, name in zip(ids, names):
+                    index.setdefault(normalize_member(name), (str(member_id), str(name)))
+            self.members[level] = index
+        return self.members[level]
+
+    def _trigram_index(self, level: str) -> Dict[str, List[str]]:
+        # only built for the levels that get a fuzzy lookup
+        if level not in self.trigrams:
+            index: Dict[str, List[str]] = {}
+            for key in self._level_index(level):
+                for trigram in trigrams(key):
+                    index.setdefault(trigram, []).append(key)
+            self.trigrams[level] = index
+        return self.trigrams[level]
+
+    def _fuzzy(self, key: str, level: str) -> Optional[Tuple[str, float]]:
+        index = self._trigram_index(level)
+        shared = Counter()
+        for trigram in trigrams(key):
+            shared.update(index.get(trigram, ()))
+
+        best = None
+        for candidate, _ in shared.most_common(self.fuzzy_candidates):
+            ratio = difflib.SequenceMatcher(None, key, candidate).ratio()
+            if ratio >= self.fuzzy_cutoff and (best is None or ratio > best[1]):
+                best = (candidate, ratio)
+        return best
+
+    def _exact(self, key: str, levels: List[str]) -> Optional[Tuple[str, str, float, str]]:
+        for level in levels:
+            match = self._level_index(level).get(key)
+            if match:
+                return match[0], level, 1.0, match[1]
+        return None
+
+    def resolve(self, value: str, levels: List[str]) -> Optional[Tuple[str, str, float, str]]:
+        """
+        Resolves a cut value against the members of the given levels.
+
+        Args:
+            value (str): The cut value, as written by the LM.
+            levels (List[str]): Levels the member can belong to.
+
+        Returns:
+            Optional[Tuple[str, str, float, str]]: (drilldown_id, drilldown, similarity, drilldown_name), or None if the value needs a similarity search.
+        """
+        key = normalize_member(value)
+        if not key:
+            return None
+
+        match = self._exact(key, levels)
+        if match:
+            return match
+
+        alias = self.aliases.get(key)
+        if alias:
+            match = self._exact(normalize_member(alias), levels)
+            if match:
+                return match
+
+        best = None
+        for level in levels:
+            match = self._fuzzy(key, level)
+            if match and (best is None or match[1] > best[2]):
+                member_id, name = self._level_index(level)[match[0]]
+                best = (member_id, level, match[1], name)
+
+        return best
+
+
+def get_member_resolver(table: Table) -> MemberResolver:
+    """
+    Retrieves the resolver of a table, creating it the first time it is requested.
+
+    Args:
+        table (Table): The table.
+
+    Returns:
+        MemberResolver: The resolver attached to the table.
+    """
+    if table.member_resolver is None:
+        table.member_resolver = MemberResolver(table)
+    return table.member_resolver
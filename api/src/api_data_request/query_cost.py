@@ -0,0 +1,166 @@
+import math
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from table_selection.table import Table
+
+STRATEGIES = ("limit", "coarsen", "reject")
+
+
+@dataclass(frozen=True)
+class QueryCost:
+    """
+    Outcome of the preflight of a query: its estimated number of rows and what was done about it.
+    action is "ok", "limited", "coarsened" or "rejected", and message explains it.
+    """
+    estimated_rows: int
+    action: str = "ok"
+    message: str = ""
+
+
+def _parse_limit(limit) -> Optional[int]:
+    # Tesseract limits are "N" or "N,offset"
+    try:
+        return int(str(limit).split(",")[0])
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_rows(table: Table, drilldowns: Iterable[str], cuts: Dict[str, Iterable[str]], limit=None) -> int:
+    """
+    Estimates the number of rows of a query from the member cardinalities of the schema.
+    Every drilldown multiplies the result by its number of members, or by the number of values cut on it.
+    A cut on a coarser level of the same hierarchy keeps the matching share of the members, e.g. 2 of 21 HS sections.
+    Levels without members in the schema are counted as a single member.
+
+    Args:
+        table (Table): The table of the query.
+        drilldowns (Iterable[str]): The drilldown levels.
+        cuts (Dict[str, Iterable[str]]): Cut level -> cut values.
+        limit (optional): The limit of the query, if any.
+
+    Returns:
+        int: The estimated number of rows.
+    """
+    cut_counts = {key: len(list(values)) for key, values in cuts.items()}
+    rows = 1
+    for drilldown in drilldowns:
+        if drilldown in cut_counts:
+            rows *= max(cut_counts[drilldown], 1)
+            continue
+
+        count = max(table.get_level_cardinality(drilldown), 1)
+        for level in table.get_dimension_levels(drilldown):
+            if level == drilldown:
+                break
+            if level in cut_counts:
+                parent_count = table.get_level_cardinality(level)
+                if parent_count:
+                    count = math.ceil(count * min(cut_counts[level], parent_count) / parent_count)
+        rows *= count
+
+    limit = _parse_limit(limit)
+    return min(rows, limit) if limit else rows
+
+
+def _coarsen(table: Table, drilldowns: List[str], cuts: Dict[str, Iterable[str]], max_rows: int) -> Tuple[Optional[List[str]], List[Tuple[str, str]]]:
+    """
+    Replaces the drilldowns with coarser levels of their hierarchies, largest first, until the estimate fits in max_rows.
+    Drilldowns that are cut keep their level, as the cut values belong to it.
+
+    Returns:
+        Tuple[Optional[List[str]], List[Tuple[str, str]]]: The new drilldowns, or None if they do not fit, and the (fine, coarse) replacements.
+    """
+    drilldowns = list(drilldowns)
+    replacements = []
+    candidates = sorted(
+        (drilldown for drilldown in drilldowns if drilldown not in cuts),
+        key=table.get_level_cardinality,
+        reverse=True,
+    )
+    for drilldown in candidates:
+        levels = table.get_dimension_levels(drilldown)
+        if drilldown not in levels:
+            continue
+        # try the finest coarser level first, to lose as little detail as possible
+        coarser_levels = levels[:levels.index(drilldown)][::-1]
+        position = drilldowns.index(drilldown)
+        for level in coarser_levels:
+            drilldowns[position] = level
+            if estimate_rows(table, drilldowns, cuts) <= max_rows:
+                replacements.append((drilldown, level))
+                return drilldowns, replacements
+        if coarser_levels:
+            drilldowns[position] = coarser_levels[-1]
+            replacements.append((drilldown, coarser_levels[-1]))
+        else:
+            drilldowns[position] = drilldown
+    return None, replacements
+
+
+def _suggestion(table: Table, drilldowns: Iterable[str], cuts: Dict[str, Iterable[str]]) -> str:
+    suggestions = []
+    for drilldown in drilldowns:
+        levels = table.get_dimension_levels(drilldown)
+        if drilldown in levels and drilldown not in cuts and levels.index(drilldown) > 0:
+            suggestions.append(f"{levels[levels.index(drilldown) - 1]} instead of {drilldown}")
+    if suggestions:
+        return "Try a coarser level (" + ", ".join(suggestions) + "), or filter the query by more members."
+    return "Try filtering the query by more members or a shorter period."
+
+
+def _query_cuts(api) -> Dict[str, Iterable[str]]:
+    # a time filter such as Year.latest.5 keeps 5 members of its level, like a cut;
+    # other time filters are left out of the estimate
+    cuts = dict(api.cuts)
+    parts = (getattr(api, "time", None) or "").split(".")
+    if len(parts) == 3 and parts[1] in ("latest", "oldest") and parts[2].isdigit():
+        cuts[parts[0]] = [parts[0]] * int(parts[2])
+    return cuts
+
+
+def preflight(api, table: Table, max_rows: int, strategy: str = "limit") -> QueryCost:
+    """
+    Estimates the size of the query of an ApiBuilder before it is fetched, and shrinks it if it exceeds max_rows.
+    The strategy is tried first, then the others in the order limit, coarsen, reject:
+    "limit" keeps the top max_rows rows by the first measure, "coarsen" moves drilldowns to coarser levels
+    and "reject" refuses the query with a suggestion.
+
+    Args:
+        api (ApiBuilder): The query. Its limit, sort and drilldowns are updated in place.
+        table (Table): The table of the query.
+        max_rows (int): Maximum number of rows to fetch.
+        strategy (str, optional): One of "limit", "coarsen" or "reject". Defaults to "limit".
+
+    Returns:
+        QueryCost: The estimate and the action taken.
+    """
+    drilldowns = sorted(api.drilldowns) or ["Year"]
+    cuts = _query_cuts(api)
+    estimated_rows = estimate_rows(table, drilldowns, cuts, api.limit)
+    if max_rows <= 0 or estimated_rows <= max_rows:
+        return QueryCost(estimated_rows)
+
+    # rejecting is the last resort, unless it was asked for
+    order = [strategy] if strategy in STRATEGIES else []
+    order += [option for option in STRATEGIES if option not in order]
+
+    for option in order:
+        if option == "limit" and api.measures:
+            if not api.sort:
+                api.set_sort(sorted(api.measures)[0], "desc")
+            api.limit = str(max_rows)
+            return QueryCost(estimated_rows, "limited", f"The query would return about {estimated_rows} rows, only the top {max_rows} are shown.")
+
+        if option == "coarsen":
+            coarse_drilldowns, replacements = _coarsen(table, drilldowns, cuts, max_rows)
+            if coarse_drilldowns is not None:
+                api.drilldowns = set(coarse_drilldowns)
+                changes = ", ".join(f"{coarse} instead of {fine}" for fine, coarse in replacements)
+                return QueryCost(estimated_rows, "coarsened", f"The query would return about {estimated_rows} rows, showing {changes}.")
+
+        if option == "reject":
+            return QueryCost(estimated_rows, "rejected", f"The query would return about {estimated_rows} rows. {_suggestion(table, drilldowns, cuts)}")
+
+    return QueryCost(estimated_rows)
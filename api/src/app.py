@@ -3,9 +3,10 @@ import time
 from typing import Dict, Tuple
 
 from table_selection.table_selector import request_tables_to_lm_from_db
-from table_selection.table import TableManager
+from table_selection.table import get_table_manager
 from api_data_request.api_generator import get_api_params_from_lm
 from api_data_request.api import ApiBuilder
+from api_data_request.columnar import dataframe_to_records
 from data_analysis.data_analysis import agent_answer
 
 # from utils.logs import *
@@ -24,7 +25,7 @@ def get_api(
     if step == "request_tables_to_lm_from_db":
         print("request_tables_to_lm_from_db")
         start_time = time.time()
-        manager = TableManager(TABLES_PATH)
+        manager = get_table_manager(TABLES_PATH)
         table, form_json, token_tracker = request_tables_to_lm_from_db(natural_language_query, manager, token_tracker)
         return get_api(
             natural_language_query,
@@ -40,6 +41,7 @@ def get_api(
         )
         print(kwargs["table"].name)
         api = ApiBuilder(table=kwargs["table"], drilldowns=variables, measures=measures, cuts=cuts, limit=limit)
+        api.preflight()
         api_url = api.build_api()
         cuts_context = api.format_cuts_context()
         print("API:", api_url)
@@ -54,9 +56,10 @@ def get_api(
         print("get_api_params_from_wrapper")
         start_time = time.time()
         table_name = form_json.get("cube")
-        manager = TableManager(TABLES_PATH)
+        manager = get_table_manager(TABLES_PATH)
         table = manager.get_table(table_name)
         api = ApiBuilder(table=table, form_json=form_json)
+        api.preflight()
         api_url = api.build_api()
         print("API:", api_url)
 
@@ -77,13 +80,13 @@ def get_api(
 
     elif step == "fetch_data":
         print("fetch_data")
-        data, df, response = kwargs["api"].fetch_data()
+        df, response = kwargs["api"].fetch_dataframe()
         print(df)
         return get_api(
             natural_language_query,
             token_tracker,
             step="agent_answer",
-            **{**kwargs, **{"df": df, "response": response, "data": data}},
+            **{**kwargs, **{"df": df, "response": response}},
         )
 
     elif step == "agent_answer":
@@ -136,6 +139,9 @@ def get_api(
                 context=cuts_context,
                 token_tracker=token_tracker,
             )
+            # the user is told when the preflight limited or coarsened the query behind the answer and the table
+            if api.cost is not None and api.cost.action != "ok":
+                kwargs["response"] = f"{kwargs['response']}\n\n{api.cost.message}"
             values.update(
                 {
                     "api_url": kwargs["api_url"],
@@ -147,7 +153,8 @@ def get_api(
                 }
             )
             # insert_logs(table=table, values=values, log_type="apicall")
-        return kwargs["api_url"], kwargs["data"], kwargs["response"]
+        # the records are only built here, for the callers that return them
+        return kwargs["api_url"], dataframe_to_records(kwargs["df"]), kwargs["response"]
 
     else:
         return get_api(natural_language_query, step="request_tables_to_lm_from_db")
@@ -35,10 +35,34 @@ else:
 
 # OLLAMA Connection
 OLLAMA_API = getenv("OLLAMA_API")
+OLLAMA_MAX_WORKERS = int(getenv("OLLAMA_MAX_WORKERS") or 8)
 
 # Tesseract Connection
 TESSERACT_API = getenv("TESSERACT_API")
 TESSERACT_API_SECRET = getenv("TESSERACT_API_SECRET")
+# Seconds to wait for a connection to / between bytes from the Tesseract API
+TESSERACT_CONNECT_TIMEOUT = float(getenv("TESSERACT_CONNECT_TIMEOUT") or 5)
+TESSERACT_READ_TIMEOUT = float(getenv("TESSERACT_READ_TIMEOUT") or 60)
+# Maximum open connections per Tesseract host, and retries on connection errors and 502/503/504
+TESSERACT_POOL_SIZE = int(getenv("TESSERACT_POOL_SIZE") or 16)
+TESSERACT_RETRIES = int(getenv("TESSERACT_RETRIES") or 2)
+# Format the API fetches from the Tesseract data endpoint: jsonarrays, csv or jsonrecords
+# (the URLs returned to clients always point to data.jsonrecords)
+TESSERACT_RESPONSE_FORMAT = getenv("TESSERACT_RESPONSE_FORMAT") or "jsonarrays"
+# Estimated rows above which a query is shrunk before it is fetched (0, the default, disables the preflight),
+# and how: limit (top rows by the first measure), coarsen (coarser drilldown levels) or reject
+QUERY_MAX_ROWS = int(getenv("QUERY_MAX_ROWS") or 0)
+QUERY_OVERSIZE_STRATEGY = getenv("QUERY_OVERSIZE_STRATEGY") or "limit"
+# Send year ranges that end at the latest year of a cube as a Tesseract time filter (time=Year.latest.N)
+# instead of one cut value per year
+TESSERACT_TIME_RANGES = (getenv("TESSERACT_TIME_RANGES") or "false").lower() == "true"
+# Number of Tesseract responses kept in memory (0 disables the cache), their maximum total size in bytes
+# and seconds they stay valid (also bounds how long values revised in Tesseract without a schema refresh are served)
+RESPONSE_CACHE_SIZE = int(getenv("RESPONSE_CACHE_SIZE") or 256)
+RESPONSE_CACHE_BYTES = int(getenv("RESPONSE_CACHE_BYTES") or 64 * 2**20)
+RESPONSE_CACHE_TTL = float(getenv("RESPONSE_CACHE_TTL") or 3600)
+# SQLite file of the compressed on-disk tier of the response cache (optional)
+RESPONSE_CACHE_PATH = getenv("RESPONSE_CACHE_PATH")
 
 # Mondrian Connection
 MONDRIAN_API = getenv("MONDRIAN_API")
@@ -61,10 +85,39 @@ DESCRIPTIONS_PATH = getenv("DESCRIPTIONS_PATH")
 if not DESCRIPTIONS_PATH:
     DESCRIPTIONS_PATH = DATA_PATH + "descriptions.json"
 
+ALIASES_PATH = getenv("ALIASES_PATH")
+if not ALIASES_PATH:
+    ALIASES_PATH = DATA_PATH + "member_aliases.json"
+
+# Number of embeddings kept in the in-memory cache
+EMBEDDINGS_CACHE_SIZE = int(getenv("EMBEDDINGS_CACHE_SIZE") or 10000)
+# SQLite file of the on-disk tier of the embedding cache (optional), and the number of embeddings it keeps
+EMBEDDINGS_CACHE_PATH = getenv("EMBEDDINGS_CACHE_PATH")
+EMBEDDINGS_CACHE_DISK_ROWS = int(getenv("EMBEDDINGS_CACHE_DISK_ROWS") or 100000)
+
+# Expose the /stats/ endpoint with the cache, encoder and Tesseract metrics (for debugging, off by default)
+STATS_ENABLED = (getenv("STATS_ENABLED") or "false").lower() == "true"
+
+# Embedding models to load at startup (comma separated)
+PRELOAD_ENCODERS = [model for model in (getenv("PRELOAD_ENCODERS") or "").split(",") if model]
+
+# Drilldown matching backend: "postgres" (match_drilldowns) or "memory" (in-process index)
+DRILLDOWN_INDEX_BACKEND = getenv("DRILLDOWN_INDEX_BACKEND") or "postgres"
+# Source of the in-process index: "database" (drilldowns table) or "schema" (schema.json members)
+DRILLDOWN_INDEX_SOURCE = getenv("DRILLDOWN_INDEX_SOURCE") or "database"
+# Storage of the in-process index embeddings: "float32", "float16" or "int8" (quantized, with exact rescoring of the best candidates)
+DRILLDOWN_INDEX_QUANTIZATION = getenv("DRILLDOWN_INDEX_QUANTIZATION") or "float32"
+# Memory-mapped file with the float32 embeddings used for rescoring, written by setup/build_drilldown_index.py
+# (optional, otherwise the candidates are rescored with their dequantized embeddings)
+DRILLDOWN_INDEX_FULL_PRECISION_PATH = getenv("DRILLDOWN_INDEX_FULL_PRECISION_PATH")
+
+# Table matching backend: "postgres" (match_table) or "memory" (description embeddings held by the TableManager)
+TABLE_SELECTION_BACKEND = getenv("TABLE_SELECTION_BACKEND") or "postgres"
+
 # Extra arguments
 SCHEMA_TABLES = getenv("SCHEMA_TABLES")
 SCHEMA_DRILLDOWNS = getenv("SCHEMA_DRILLDOWNS")
 SCHEMA_LOGS = getenv("SCHEMA_LOGS")
 CUBES_TABLE_NAME = getenv("CUBES_TABLE_NAME")
-DRILLDOWNS_TABLE_NAME = getenv("DRILLDOWNS_TABLE_NAME")
+DRILLDOWNS_TABLE_NAME = getenv("DRILLDOWNS_TABLE_NAME") or "drilldowns"
 LOGS_TABLE_NAME = getenv("LOGS_TABLE_NAME")
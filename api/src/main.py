@@ -2,7 +2,7 @@ import time
 import json
 from os import getenv
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from langchain_core.runnables import RunnableLambda, chain
@@ -10,7 +10,11 @@ from pydantic import BaseModel
 from typing import List, Dict
 
 from app import get_api
-from config import TABLES_PATH
+from config import TABLES_PATH, PRELOAD_ENCODERS, STATS_ENABLED
+from table_selection.table import get_table_manager, get_table_manager_stats
+from utils.encoders import get_encoder_stats, preload_encoders
+from utils.response_cache import get_response_cache_stats
+from utils.tesseract_client import get_tesseract_client
 from wrapper.lanbot import Langbot
 from wrapper.reflexionWrappper import wrapperCall
 
@@ -29,6 +33,12 @@ if getenv("ENVIRONMENT") and getenv("ENVIRONMENT") == "local":
         allow_headers=["*"],
     )
 
+@app.on_event("startup")
+def load_encoders():
+    preload_encoders(PRELOAD_ENCODERS)
+    get_table_manager(TABLES_PATH)
+
+
 # api functions
 @app.get("/")
 async def root():
@@ -37,6 +47,19 @@ async def root():
         "status": "ok"
       }
 
+@app.get("/stats/")
+async def stats():
+    # internal metrics, only exposed when enabled for debugging
+    if not STATS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {
+        "encoders": get_encoder_stats(),
+        "tables": get_table_manager_stats(),
+        "tesseract": get_tesseract_client().get_stats(),
+        "responses": get_response_cache_stats(),
+      }
+
+
 class Item(BaseModel):
     query: List[Dict]
     form_json: Dict | None = None
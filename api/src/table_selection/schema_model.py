@@ -0,0 +1,109 @@
+import sys
+
+import orjson
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+def _intern(value):
+    # names and members repeat across cubes (countries, years, products), so they are stored once
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class Measure:
+    name: str
+    description: Optional[str] = None
+    annotations: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Measure":
+        return cls(_intern(data['name']), data.get('description'), data.get('annotations') or {})
+
+
+@dataclass(slots=True)
+class Level:
+    name: str
+    unique_name: Optional[str] = None
+    members: Optional[List[Any]] = None
+    member_ids: Optional[List[Any]] = None
+
+    @property
+    def level_name(self) -> str:
+        """
+        The name the level is referred to by: its unique name if it has one, otherwise its name.
+        """
+        return self.unique_name or self.name
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Level":
+        members = data.get('members')
+        member_ids = data.get('member_ids')
+        return cls(
+            _intern(data['name']),
+            _intern(data.get('unique_name')),
+            [_intern(member) for member in members] if members is not None else None,
+            [_intern(member_id) for member_id in member_ids] if member_ids is not None else None,
+        )
+
+
+@dataclass(slots=True)
+class Hierarchy:
+    name: str
+    levels: List[Level] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Hierarchy":
+        return cls(_intern(data['name']), [Level.from_dict(level) for level in data.get('levels', [])])
+
+
+@dataclass(slots=True)
+class Dimension:
+    name: str
+    description: Optional[str] = None
+    default_hierarchy: Optional[str] = None
+    hierarchies: List[Hierarchy] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Dimension":
+        return cls(
+            _intern(data['name']),
+            data.get('description'),
+            _intern(data.get('default_hierarchy')),
+            [Hierarchy.from_dict(hierarchy) for hierarchy in data.get('hierarchies', [])],
+        )
+
+
+@dataclass(slots=True)
+class Cube:
+    name: str
+    api: Optional[str] = None
+    description: Optional[str] = None
+    measures: List[Measure] = field(default_factory=list)
+    dimensions: List[Dimension] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Cube":
+        return cls(
+            _intern(data['name']),
+            _intern(data.get('api')),
+            data.get('description'),
+            [Measure.from_dict(measure) for measure in data.get('measures', [])],
+            [Dimension.from_dict(dimension) for dimension in data.get('dimensions', [])],
+        )
+
+
+def load_schema(tables_path: str) -> List[Cube]:
+    """
+    Loads the cubes of a schema JSON file into the typed model.
+
+    Args:
+        tables_path (str): The path to the schema JSON file.
+
+    Returns:
+        List[Cube]: The cubes of the schema.
+    """
+    with open(tables_path, 'rb') as file:
+        data = orjson.loads(file.read())
+    return [Cube.from_dict(cube) for cube in data.get('cubes', [])]
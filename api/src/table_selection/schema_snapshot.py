@@ -0,0 +1,168 @@
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+import orjson
+
+from typing import Dict, List
+
+from table_selection.schema_model import Cube
+from utils.member_store import MemberStore, encode_member_store, get_members_path
+
+MAGIC = b"SCHSNAP1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("!8sIQ")
+ALIGNMENT = 64
+
+
+def get_snapshot_path(tables_path: str) -> str:
+    """
+    Returns the path of the compiled snapshot that goes with a schema JSON file, e.g. schema.json -> schema.snapshot.
+    """
+    return os.path.splitext(tables_path)[0] + ".snapshot"
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def schema_digest(tables_path: str) -> str:
+    """
+    Hashes a schema JSON file and its members side file, if any, to tell which schema version a snapshot was compiled from.
+    """
+    members_path = get_members_path(tables_path)
+    return _file_digest(tables_path) + (_file_digest(members_path) if os.path.exists(members_path) else "")
+
+
+def write_snapshot(tables_path: str, path: str, description_embeddings: Dict[str, np.ndarray] = None) -> Dict:
+    """
+    Compiles a schema JSON file, its members and the table description embeddings into one binary snapshot.
+    The file holds a header with the section offsets, then the schema metadata, the members blob
+    and one float32 matrix per embedding model, aligned so they can be used straight from the memory map.
+
+    Args:
+        tables_path (str): The path to the schema JSON file.
+        path (str): The path of the snapshot.
+        description_embeddings (Dict[str, np.ndarray], optional): Embedding model -> one normalized embedding per cube, in schema order. Defaults to None.
+
+    Returns:
+        Dict: The header of the snapshot.
+    """
+    with open(tables_path, 'rb') as file:
+        schema_json = orjson.loads(file.read())
+
+    # members inlined in the schema are moved to the snapshot, otherwise the side file is embedded as is
+    members = encode_member_store(schema_json)
+    members_path = get_members_path(tables_path)
+    if os.path.exists(members_path):
+        with open(members_path, 'rb') as file:
+            members = file.read()
+
+    sections = [("schema", orjson.dumps(schema_json)), ("members", members)]
+    embeddings_info = {}
+    for model, embeddings in (description_embeddings or {}).items():
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        embeddings_info[model] = list(embeddings.shape)
+        sections.append((f"embeddings:{model}", embeddings.tobytes()))
+
+    header = {
+        "format": FORMAT_VERSION,
+        "source_digest": schema_digest(tables_path),
+        "compiled_at": time.time(),
+        "embeddings": embeddings_info,
+        "sections": {},
+    }
+
+    # offsets are relative to the end of the header, so they do not depend on the header size
+    offset = 0
+    for name, data in sections:
+        offset += -offset % ALIGNMENT
+        header["sections"][name] = [offset, len(data)]
+        offset += len(data)
+
+    header_bytes = orjson.dumps(header)
+    prefix_size = HEADER.size + len(header_bytes)
+    padding = -prefix_size % ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(header_bytes) + padding))
+        file.write(header_bytes + b" " * padding)
+        position = 0
+        for name, data in sections:
+            start = header["sections"][name][0]
+            file.write(b"\0" * (start - position))
+            file.write(data)
+            position = start + len(data)
+    os.replace(tmp_path, path)
+
+    return header
+
+
+class SchemaSnapshot:
+    """
+    Read-only view of a compiled schema snapshot. The file is memory-mapped, so the members and embeddings
+    are read from pages shared by every worker that maps the same file.
+    """
+    def __init__(self, path: str):
+        """
+        Initializes the SchemaSnapshot.
+
+        Args:
+            path (str): The path of the snapshot.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_size = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} schema snapshot")
+        self.header = orjson.loads(self.mmap[HEADER.size:HEADER.size + header_size])
+        self.data_offset = HEADER.size + header_size
+        self.source_digest = self.header["source_digest"]
+
+    def _section(self, name: str):
+        offset, size = self.header["sections"][name]
+        return self.data_offset + offset, size
+
+    def load_cubes(self) -> List[Cube]:
+        """
+        Decodes the schema metadata of the snapshot.
+
+        Returns:
+            List[Cube]: The cubes of the schema.
+        """
+        offset, size = self._section("schema")
+        data = orjson.loads(self.mmap[offset:offset + size])
+        return [Cube.from_dict(cube) for cube in data.get('cubes', [])]
+
+    def member_store(self) -> MemberStore:
+        """
+        Opens the members of the snapshot.
+
+        Returns:
+            MemberStore: The members, read from the snapshot file.
+        """
+        offset, _ = self._section("members")
+        return MemberStore(self.path, offset=offset)
+
+    def description_embeddings(self) -> Dict[str, np.ndarray]:
+        """
+        Retrieves the table description embeddings of the snapshot, without copying them out of the memory map.
+
+        Returns:
+            Dict[str, np.ndarray]: Embedding model -> read-only matrix with one embedding per cube.
+        """
+        embeddings = {}
+        for model, shape in self.header["embeddings"].items():
+            offset, _ = self._section(f"embeddings:{model}")
+            embeddings[model] = np.frombuffer(self.mmap, dtype=np.float32, count=shape[0] * shape[1], offset=offset).reshape(shape)
+        return embeddings
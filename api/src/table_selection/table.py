@@ -1,27 +1,121 @@
-import json
+import functools
+import hashlib
+import os
+import threading
+import time
 
+import numpy as np
+
+from collections import OrderedDict
 from typing import List, Dict, Any, Union
 
+from table_selection.schema_model import Cube, load_schema
+from table_selection.schema_snapshot import SchemaSnapshot, get_snapshot_path, schema_digest
+from utils.member_store import MemberStore, get_members_path
+
+
+def memoize_render(copy=None, max_entries: int = 32):
+    """
+    Caches the result of a Table or TableManager method per instance and arguments.
+    Instances are rebuilt when the schema changes, so the cache never outlives its schema version.
+    Arguments may come from the language model, so each method keeps only its max_entries most recently used results.
+
+    Args:
+        copy (callable, optional): Applied to the cached value before returning it, for values callers may modify. Defaults to None.
+        max_entries (int, optional): Results kept per method and instance. Defaults to 32.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self._rendered.setdefault(method.__name__, OrderedDict())
+            key = (args, tuple(sorted(kwargs.items())))
+            try:
+                value = cache[key]
+                cache.move_to_end(key)
+            except KeyError:
+                value = cache[key] = method(self, *args, **kwargs)
+                while len(cache) > max_entries:
+                    cache.popitem(last=False)
+            return copy(value) if copy else value
+        return wrapper
+    return decorator
+
+
+def _copy_dicts(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if items is None:
+        return None
+    return [{key: list(value) if isinstance(value, list) else value for key, value in item.items()} for item in items]
+
+
+def _copy_json(value):
+    # copies only the containers, which is all a form template holds besides immutable values
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+def _description(item) -> str:
+    return item.description if item.description is not None else 'No description'
+
+
 class Table:
     """
     Represents a table with its schema and methods for data retrieval.
     """
-    def __init__(self, table_data: Dict[str, Any]):
+    def __init__(self, table_data: Union[Cube, Dict[str, Any]], member_store: MemberStore = None, source_version: str = ""):
         """
         Initializes the Table object.
 
         Args:
-            table_data (Dict[str, Any]): Data containing information about the table.
-        """
-        self.name = table_data['name']
-        self.api = table_data.get('api')
-        self.description = table_data.get('description')
-        self.measures = [measure['name'] for measure in table_data.get('measures', [])]
-        self.dimensions = [dimension['name'] for dimension in table_data.get('dimensions', [])]
+            table_data (Union[Cube, Dict[str, Any]]): Data containing information about the table, typed or as in schema.json.
+            member_store (MemberStore, optional): Side file holding the members of the levels, when they are not in the schema. Defaults to None.
+            source_version (str, optional): Version of the files the table was loaded from, see get_source_version. Defaults to "".
+        """
+        if isinstance(table_data, dict):
+            table_data = Cube.from_dict(table_data)
+        self.name = table_data.name
+        self.api = table_data.api
+        self.description = table_data.description
+        self.measures = [measure.name for measure in table_data.measures]
+        self.dimensions = [dimension.name for dimension in table_data.dimensions]
         self.schema = table_data
+        self.member_store = member_store
+        self.member_resolver = None
+        self._rendered = {}
+        self._build_indexes()
+        self.latest_year = self._get_latest_year()
+        self.years = self._get_years()
+        self.form_template = self._build_form_template()
+        self.data_version = self._get_data_version(source_version)
+
+    def _build_indexes(self):
+        """
+        Builds the lookups used by the methods below, so they do not walk the schema on every call.
+        When names repeat, the first occurrence wins, as in a scan of the schema.
+        """
+        self.levels_by_name = {}        # level name -> (dimension, hierarchy, level)
+        self.hierarchy_levels = {}      # level name or unique name -> levels of its hierarchy
+        self.dimension_levels = {}      # dimension name -> levels of all its hierarchies
+        self.all_levels = []
+
+        for dimension in self.schema.dimensions:
+            levels_of_dimension = []
+            for hierarchy in dimension.hierarchies:
+                levels_of_hierarchy = [level.level_name for level in hierarchy.levels]
+                for level in hierarchy.levels:
+                    self.levels_by_name.setdefault(level.level_name, (dimension, hierarchy, level))
+                    self.hierarchy_levels.setdefault(level.name, levels_of_hierarchy)
+                    if level.unique_name is not None:
+                        self.hierarchy_levels.setdefault(level.unique_name, levels_of_hierarchy)
+                levels_of_dimension.extend(levels_of_hierarchy)
+            self.dimension_levels.setdefault(dimension.name, levels_of_dimension)
+            self.all_levels.extend(levels_of_dimension)
 
     # Methods used in prompts
                 
+    @memoize_render()
     def prompt_schema_description(self, descriptions: bool = False) -> str:
         """
         Generates a description of the table schema.
@@ -33,13 +127,14 @@ class Table:
             str: The schema description.
         """
         if descriptions:
-            dimensions_str = ", ".join([f"{var['name']}" for var in self.schema['dimensions']])
-            measures_str = ", ".join([f"{measure['name']}" for measure in self.schema['measures']])
+            dimensions_str = ", ".join([f"{var.name}" for var in self.schema.dimensions])
+            measures_str = ", ".join([f"{measure.name}" for measure in self.schema.measures])
         else: 
-            dimensions_str = ", ".join([f"{var['name']} ({var.get('description', 'No description')})" for var in self.schema['dimensions']])
-            measures_str = ", ".join([f"{measure['name']} ({measure.get('description', 'No description')})" for measure in self.schema['measures']])
+            dimensions_str = ", ".join([f"{var.name} ({_description(var)})" for var in self.schema.dimensions])
+            measures_str = ", ".join([f"{measure.name} ({_description(measure)})" for measure in self.schema.measures])
         return f"Table Name: {self.name}\nDescription: {self.description}\nDimensions: {dimensions_str}\nMeasures: {measures_str}\n"
 
+    @memoize_render(copy=_copy_dicts)
     def prompt_get_dimensions(self, dimension_name: str = None) -> List[Dict[str, Any]]:
         """
         Generates a description of dimension levels.
@@ -50,27 +145,21 @@ class Table:
         Returns:
             List[Dict[str, Any]]: Description of dimension levels.
         """
-        dimensions = self.schema['dimensions']
-        
-        def get_level_name(level):
-            return level.get('unique_name') or level['name']
-        
         if dimension_name:
-            dimension = next((dim for dim in dimensions if dim['name'] == dimension_name), None)
-            if dimension:
-                levels = [get_level_name(level) for hierarchy in dimension['hierarchies'] for level in hierarchy['levels']]
+            if dimension_name in self.dimension_levels:
                 return [{
-                    "name": dimension['name'],
-                    "levels": levels
+                    "name": dimension_name,
+                    "levels": list(self.dimension_levels[dimension_name])
                 }]
             else:
                 return []
         else:
             return [{
-                "name": dimension['name'],
-                "levels": [get_level_name(level) for hierarchy in dimension['hierarchies'] for level in hierarchy['levels']]
-            } for dimension in dimensions]
+                "name": dimension.name,
+                "levels": [level.level_name for hierarchy in dimension.hierarchies for level in hierarchy.levels]
+            } for dimension in self.schema.dimensions]
         
+    @memoize_render()
     def prompt_columns_description(self, include_levels: bool = False) -> str:
         """
         Generates a description of columns.
@@ -82,27 +171,27 @@ class Table:
             str: The description of columns.
         """
         dimensions_str_list = []
-        for dimension in self.schema['dimensions']:
-            default_hierarchy_name = dimension['default_hierarchy']
+        for dimension in self.schema.dimensions:
+            default_hierarchy_name = dimension.default_hierarchy
             if default_hierarchy_name:
-                for hierarchy in dimension['hierarchies']:
-                    if hierarchy['name'] == default_hierarchy_name:
+                for hierarchy in dimension.hierarchies:
+                    if hierarchy.name == default_hierarchy_name:
                         if include_levels:
-                            levels = [level['unique_name'] if level.get('unique_name') else level['name'] for level in hierarchy['levels']]
-                            dimensions_str_list.append(f"{dimension['name']} ({dimension.get('description', 'No description')}) [Levels: {', '.join(levels)}];\n")
+                            levels = [level.level_name for level in hierarchy.levels]
+                            dimensions_str_list.append(f"{dimension.name} ({_description(dimension)}) [Levels: {', '.join(levels)}];\n")
                         else: 
-                            dimensions_str_list.append(f"{dimension['name']} ({dimension.get('description', 'No description')});\n")
+                            dimensions_str_list.append(f"{dimension.name} ({_description(dimension)});\n")
                         break
             else:
                 if include_levels: 
-                    levels = [level['unique_name'] if level.get('unique_name') else level['name'] for level in dimension['hierarchies'][0]['levels']]
-                    dimensions_str_list.append(f"{dimension['name']} ({dimension.get('description', 'No description')}) [Levels: {', '.join(levels)}];\n")
+                    levels = [level.level_name for level in dimension.hierarchies[0].levels]
+                    dimensions_str_list.append(f"{dimension.name} ({_description(dimension)}) [Levels: {', '.join(levels)}];\n")
                 else: 
-                    dimensions_str_list.append(f"{dimension['name']} ({dimension.get('description', 'No description')});\n")
+                    dimensions_str_list.append(f"{dimension.name} ({_description(dimension)});\n")
         
         measures_str_list = [
-            f"{measure['name']} ({measure.get('description', 'No description')});\n"
-            for measure in self.schema['measures']
+            f"{measure.name} ({_description(measure)});\n"
+            for measure in self.schema.measures
         ]
         
         dimensions_str = ''.join(dimensions_str_list)
@@ -113,6 +202,7 @@ class Table:
     
     # Other methods
 
+    @memoize_render(copy=_copy_dicts)
     def get_measures_description(self, measure_name: str = None) -> List[Dict[str, Any]]:
         """
         Retrieves descriptions of measures.
@@ -125,22 +215,22 @@ class Table:
         """
         measures_description = []
         if measure_name:
-            for measure in self.schema['measures']:
-                if measure['name'] == measure_name:
+            for measure in self.schema.measures:
+                if measure.name == measure_name:
                     description = {
-                        "name": measure['name'],
-                        "units_of_measurement": measure.get('annotations', {}).get('units_of_measurement', ''),
-                        "description": measure.get('annotations', {}).get('details', '')
+                        "name": measure.name,
+                        "units_of_measurement": measure.annotations.get('units_of_measurement', ''),
+                        "description": measure.annotations.get('details', '')
                     }
                     measures_description.append(description)
                     return measures_description
                 
         else:
-            for measure in self.schema['measures']:
+            for measure in self.schema.measures:
                 description = {
-                    "name": measure['name'],
-                    "units_of_measurement": measure.get('annotations', {}).get('units_of_measurement', ''),
-                    "description": measure.get('annotations', {}).get('details', '')
+                    "name": measure.name,
+                    "units_of_measurement": measure.annotations.get('units_of_measurement', ''),
+                    "description": measure.annotations.get('details', '')
                 }
                 measures_description.append(description)
             return measures_description
@@ -156,18 +246,18 @@ class Table:
             List[Dict[str, Any]]: Descriptions of dimensions.
         """
         if dimension_name:
-            for dimension in self.schema['dimensions']:
-                if dimension['name'] == dimension_name:
+            for dimension in self.schema.dimensions:
+                if dimension.name == dimension_name:
                     return [{
-                        "name": dimension['name'],
-                        "description": dimension['description']
+                        "name": dimension.name,
+                        "description": dimension.description
                     }]
             return []
         else:
             return [{
-                "name": dimension['name'],
-                "description": dimension['description']
-            } for dimension in self.schema['dimensions']]
+                "name": dimension.name,
+                "description": dimension.description
+            } for dimension in self.schema.dimensions]
 
     def get_dimension_hierarchies(self, dimension_name: str = None) -> List[Dict[str, Any]]:
         """
@@ -180,28 +270,28 @@ class Table:
             List[Dict[str, Any]]: Dimension hierarchies.
         """
         if dimension_name:
-            for dimension in self.schema['dimensions']:
-                if dimension['name'] == dimension_name:
+            for dimension in self.schema.dimensions:
+                if dimension.name == dimension_name:
                     return [{
-                        "name": dimension['name'],
+                        "name": dimension.name,
                         "hierarchies": [{
-                            "name": hierarchy['name'],
-                            "levels": [{"name": level['name']} for level in hierarchy['levels']]
-                        } for hierarchy in dimension['hierarchies']],
-                        "default_hierarchy": dimension['default_hierarchy'],
-                        "description": dimension['description']
+                            "name": hierarchy.name,
+                            "levels": [{"name": level.name} for level in hierarchy.levels]
+                        } for hierarchy in dimension.hierarchies],
+                        "default_hierarchy": dimension.default_hierarchy,
+                        "description": dimension.description
                     }]
             return []
         else:
             return [{
-                "name": dimension['name'],
+                "name": dimension.name,
                 "hierarchies": [{
-                    "name": hierarchy['name'],
-                    "levels": [{"name": level['name']} for level in hierarchy['levels']]
-                } for hierarchy in dimension['hierarchies']],
-                "default_hierarchy": dimension['default_hierarchy'],
-                "description": dimension['description']
-            } for dimension in self.schema['dimensions']]
+                    "name": hierarchy.name,
+                    "levels": [{"name": level.name} for level in hierarchy.levels]
+                } for hierarchy in dimension.hierarchies],
+                "default_hierarchy": dimension.default_hierarchy,
+                "description": dimension.description
+            } for dimension in self.schema.dimensions]
         
     def get_drilldown_members(self, drilldown_name: str) -> List[str]:
         """
@@ -213,16 +303,47 @@ class Table:
         Returns:
             List[str]: Drilldown members.
         """
-        for dimension in self.schema['dimensions']:
-            for hierarchy in dimension['hierarchies']:
-                for level in hierarchy['levels']:
-                    if level['unique_name'] is not None: level_name = level['unique_name']
-                    else: level_name = level['name']
-   
-                    if level_name == drilldown_name:
-                        return level['members']
+        if drilldown_name in self.levels_by_name:
+            _, _, level = self.levels_by_name[drilldown_name]
+            if level.members is not None or self.member_store is None:
+                return level.members or []
+            return self.member_store.get(self.name, drilldown_name)[0]
+        return []
+
+    def get_drilldown_member_ids(self, drilldown_name: str) -> List[str]:
+        """
+        Retrieves the ids of the drilldown members, aligned with get_drilldown_members.
+
+        Args:
+            drilldown_name (str): The name of the drilldown/level.
+
+        Returns:
+            List[str]: Drilldown member ids, or an empty list if the schema does not store them.
+        """
+        if drilldown_name in self.levels_by_name:
+            _, _, level = self.levels_by_name[drilldown_name]
+            if level.members is not None or self.member_store is None:
+                return level.member_ids or []
+            return self.member_store.get(self.name, drilldown_name)[1]
         return []
     
+    def get_level_cardinality(self, drilldown_name: str) -> int:
+        """
+        Counts the members of a drilldown without decoding them from the member store.
+
+        Args:
+            drilldown_name (str): The name of the drilldown/level.
+
+        Returns:
+            int: Number of members, or 0 if the level is unknown or the schema does not store its members.
+        """
+        if drilldown_name in self.levels_by_name:
+            _, _, level = self.levels_by_name[drilldown_name]
+            if level.members is not None or self.member_store is None:
+                return len(level.members or [])
+            return self.member_store.count(self.name, drilldown_name)
+        return 0
+
     def get_dimension_levels(self, name: str = None) -> List[str]:
         """
         Retrieves dimension levels.
@@ -235,55 +356,59 @@ class Table:
         """
         if name:
             # Check if the provided name is a level name
-            for dimension in self.schema['dimensions']:
-                for hierarchy in dimension['hierarchies']:
-                    for level in hierarchy['levels']:
-                        if level['name'] == name or level['unique_name'] == name:
-                            levels = []
-                            for level in hierarchy['levels']:
-                                if level['unique_name'] is not None:
-                                    levels.append(level['unique_name'])
-                                else:
-                                    levels.append(level['name'])
-                            return levels
-            
+            if name in self.hierarchy_levels:
+                return list(self.hierarchy_levels[name])
+
             # If the provided name is not a level name, it might be a dimension name
-            for dimension in self.schema['dimensions']:
-                if dimension['name'] == name:
-                    levels = []
-                    for hierarchy in dimension['hierarchies']:
-                        for level in hierarchy['levels']:
-                            if level['unique_name'] is not None:
-                                levels.append(level['unique_name'])
-                            else:
-                                levels.append(level['name'])
-                    return levels
-            
+            if name in self.dimension_levels:
+                return list(self.dimension_levels[name])
+
             # If neither a dimension nor a level with the provided name is found
             return []
         
         else:
-            all_levels = []
-            for dimension in self.schema['dimensions']:
-                for hierarchy in dimension['hierarchies']:
-                    for level in hierarchy['levels']:
-                        if level['unique_name'] is not None:
-                            all_levels.append(level['unique_name'])
-                        else:
-                            all_levels.append(level['name'])
-            return all_levels
-
-    def get_form_json(self):
+            return list(self.all_levels)
+
+    def _get_latest_year(self):
+        """
+        Finds the latest year among the members of the Year level, or None if the table has no years.
+        """
+        years = self.get_drilldown_members(drilldown_name = 'Year')
+        return max(years) if years else None
+
+    def _get_years(self) -> List[int]:
+        """
+        Lists the years available in the table, sorted, from the members of the Year level.
+        """
+        years = set()
+        for year in self.get_drilldown_members(drilldown_name = 'Year'):
+            try:
+                years.add(int(year))
+            except (TypeError, ValueError):
+                continue
+        return sorted(years)
+
+    def _get_data_version(self, source_version: str = "") -> str:
+        """
+        Fingerprints the data of the table from the version of its schema files, its latest year and the number of members of each level,
+        so cached responses are dropped whenever the schema is refreshed, even if its members did not change.
+        """
+        digest = hashlib.sha1(f"{self.name}|{source_version}|{self.latest_year}".encode("utf-8"))
+        for level_name in self.levels_by_name:
+            digest.update(f"|{level_name}:{self.get_level_cardinality(level_name)}".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _build_form_template(self) -> Dict[str, Any]:
         #levels = self.get_dimension_levels()
-        dimensions_info = self.schema["dimensions"]
+        dimensions_info = self.schema.dimensions
 
         drilldowns = {}
 
         dimension_hierarchies = {}
         for dimension_info in dimensions_info:
-            dimension_name = dimension_info["name"]
-            for hierarchy_info in dimension_info["hierarchies"]:
-                hierarchy_name = hierarchy_info["name"]
+            dimension_name = dimension_info.name
+            for hierarchy_info in dimension_info.hierarchies:
+                hierarchy_name = hierarchy_info.name
                 if hierarchy_name not in dimension_hierarchies:
                     dimension_hierarchies[hierarchy_name] = []
                 dimension_hierarchies[hierarchy_name].append(dimension_name)
@@ -291,10 +416,8 @@ class Table:
         for hierarchy_name, dimensions in dimension_hierarchies.items():
             if len(dimensions) == 1:
                 dimension_name = dimensions[0]
-                if dimension_name == 'Time' or dimension_name == 'Year': 
-                    years = self.get_drilldown_members(drilldown_name = 'Year')
-                    latest_year = max(years)
-                    drilldowns[dimension_name] = [latest_year]
+                if (dimension_name == 'Time' or dimension_name == 'Year') and self.latest_year is not None: 
+                    drilldowns[dimension_name] = [self.latest_year]
                 else:
                     drilldowns[dimension_name] = []
             else:
@@ -317,6 +440,16 @@ class Table:
 
         return json_data
 
+    def get_form_json(self) -> Dict[str, Any]:
+        """
+        Retrieves the default form of the table, with the latest year selected.
+        The template is built when the table is loaded, so this only copies it.
+
+        Returns:
+            Dict[str, Any]: A copy of the form, which the caller can fill in.
+        """
+        return _copy_json(self.form_template)
+
     def __str__(self) -> str:
         """
         Returns a string representation of the table.
@@ -325,32 +458,76 @@ class Table:
             str: String representation.
         """
         return self.prompt_schema_description(descriptions=True)
+
+
+def get_source_version(tables_path: str) -> str:
+    """
+    Versions a schema JSON file, its members side file and its snapshot by their modification times,
+    which change on every schema refresh, including those that rewrite the same members.
+
+    Args:
+        tables_path (str): The path to the tables JSON file.
+
+    Returns:
+        str: The modification times of the existing files.
+    """
+    paths = [tables_path, get_members_path(tables_path), get_snapshot_path(tables_path)]
+    return ",".join(str(os.stat(path).st_mtime_ns) if os.path.exists(path) else "-" for path in paths)
     
 
 class TableManager:
     """
     Manages tables and provides methods for interacting with them.
     """
-    def __init__(self, tables_path: str):
+    def __init__(self, tables_path: str, members_path: str = None, snapshot: SchemaSnapshot = None):
         """
         Initializes the TableManager.
 
         Args:
             tables_path (str): The path to the tables JSON file.
+            members_path (str, optional): The path to the members side file. Defaults to the one next to the tables JSON file, if it exists.
+            snapshot (SchemaSnapshot, optional): Compiled snapshot of the tables JSON file, used instead of the JSON and side files. Defaults to None.
         """
         self.tables_path = tables_path
+        self.snapshot = snapshot
+        self.source_version = get_source_version(tables_path)
+        self.description_embeddings = {}
+        self._rendered = {}
+
+        if snapshot is not None:
+            self.members_path = snapshot.path
+            self.member_store = snapshot.member_store()
+            # precomputed and normalized, used in place from the snapshot
+            self.description_embeddings.update(snapshot.description_embeddings())
+        else:
+            self.members_path = members_path or get_members_path(tables_path)
+            self.member_store = MemberStore(self.members_path) if os.path.exists(self.members_path) else None
+
         self.tables = self.load_tables()
+        self.tables_by_name = {}
+        for table in self.tables:
+            self.tables_by_name.setdefault(table.name, table)
 
     def load_tables(self) -> List[Table]:
         """
-        Loads tables from the JSON file.
+        Loads tables from the snapshot, or from the JSON file if there is none.
 
         Returns:
             List[Table]: List of loaded tables.
         """
-        with open(self.tables_path, 'r') as file:
-            data = json.load(file)
-            return [Table(table_data) for table_data in data.get('cubes', [])]
+        cubes = self.snapshot.load_cubes() if self.snapshot is not None else load_schema(self.tables_path)
+        return [Table(cube, self.member_store, self.source_version) for cube in cubes]
+
+    def refresh_data_versions(self):
+        """
+        Updates the data version of the tables after their files were rewritten with the same content,
+        so responses cached before the schema refresh are not served anymore.
+        """
+        source_version = get_source_version(self.tables_path)
+        if source_version != self.source_version:
+            self.source_version = source_version
+            for table in self.tables:
+                table.data_version = table._get_data_version(source_version)
 
     def get_table(self, name: str) -> Union[Table, None]:
         """
@@ -362,10 +539,7 @@ class TableManager:
         Returns:
             Union[Table, None]: The table if found, None otherwise.
         """
-        for table in self.tables:
-            if table.name == name:
-                return table
-        return None
+        return self.tables_by_name.get(name)
 
     def list_tables(self) -> List[str]:
         """
@@ -399,10 +573,154 @@ class TableManager:
         Returns:
             str: Schemas of the tables.
         """
+        # the same candidate set in any order renders the same string
+        return self._render_table_schemas(None if table_names is None else frozenset(table_names))
+
+    @memoize_render()
+    def _render_table_schemas(self, table_names: frozenset = None) -> str:
         tables_str_list = []
         
         for table in self.tables:
             if table_names is None or table.name in table_names:
                 tables_str_list.append(table.prompt_schema_description())
         
-        return "\n\n".join(tables_str_list)
\ No newline at end of file
+        return "\n\n".join(tables_str_list)
+
+    def set_description_embeddings(self, embedding_model: str, embeddings: np.ndarray):
+        """
+        Stores the embeddings of the table descriptions, used to match questions to tables in memory.
+
+        Args:
+            embedding_model (str): The model used to compute the embeddings.
+            embeddings (np.ndarray): Matrix with one embedding per table, in the order of self.tables.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.description_embeddings[embedding_model] = embeddings / norms
+
+    def get_similar_tables(self, vector: np.ndarray, embedding_model: str, content_limit: int = 1, threshold: float = 0) -> List[str]:
+        """
+        Retrieves the tables whose descriptions are most similar to the given embedding.
+
+        Args:
+            vector (np.ndarray): Embedding of the question.
+            embedding_model (str): The model used to compute the embedding.
+            content_limit (int, optional): Number of table names to retrieve. Defaults to 1.
+            threshold (float, optional): Minimum cosine similarity. Defaults to 0.
+
+        Returns:
+            List[str]: Table names, most similar first.
+        """
+        embeddings = self.description_embeddings[embedding_model]
+
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        similarities = embeddings @ query
+        order = np.argsort(-similarities)[:content_limit]
+
+        return [self.tables[i].name for i in order if similarities[i] > threshold]
+
+
+_table_manager = None
+_table_manager_version = None
+_table_manager_lock = threading.Lock()
+_table_manager_stats = {
+    "loads": 0,
+    "load_time": 0.0,
+    "last_load_time": 0.0,
+    "last_loaded_at": None,
+    "last_source": None,
+    "checks": 0,
+}
+
+
+def _load_snapshot(tables_path: str, digest: str) -> Union[SchemaSnapshot, None]:
+    snapshot_path = get_snapshot_path(tables_path)
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        snapshot = SchemaSnapshot(snapshot_path)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring schema snapshot {snapshot_path}: {e}")
+        return None
+    if snapshot.source_digest != digest:
+        print(f"Ignoring schema snapshot {snapshot_path}: it was compiled from another version of {tables_path}")
+        return None
+    return snapshot
+
+
+def get_table_manager(tables_path: str) -> TableManager:
+    """
+    Retrieves the process-wide TableManager, loading the tables JSON file the first time it is requested
+    and again whenever the file, its members side file or its snapshot changes. Changes are detected by modification time and size,
+    and confirmed with the hash of the files, so touching them does not trigger a reload.
+    When a snapshot compiled from the current files exists, the tables are mapped from it instead of parsed.
+    A reload builds a new TableManager, so callers holding the previous one keep a consistent view.
+
+    Args:
+        tables_path (str): The path to the tables JSON file.
+
+    Returns:
+        TableManager: The shared TableManager.
+    """
+    global _table_manager, _table_manager_version
+
+    # the members side file and the snapshot are rewritten along with the schema, so a change in any of them reloads the tables
+    signature = [tables_path]
+    for path in [tables_path, get_members_path(tables_path), get_snapshot_path(tables_path)]:
+        path_stat = os.stat(path) if path == tables_path or os.path.exists(path) else None
+        signature += [path_stat and path_stat.st_mtime_ns, path_stat and path_stat.st_size]
+    signature = tuple(signature)
+    _table_manager_stats["checks"] += 1
+
+    if _table_manager is not None and _table_manager_version[0] == signature:
+        return _table_manager
+
+    with _table_manager_lock:
+        if _table_manager is not None and _table_manager_version[0] == signature:
+            return _table_manager
+
+        digest = schema_digest(tables_path)
+        snapshot = _load_snapshot(tables_path, digest)
+        if _table_manager is not None and _table_manager_version[1] == digest and _table_manager.tables_path == tables_path \
+                and (snapshot is None) == (_table_manager.snapshot is None):
+            # same content: the tables are kept, but the refresh still invalidates the cached responses
+            _table_manager.refresh_data_versions()
+            _table_manager_version = (signature, digest)
+            return _table_manager
+
+        start_time = time.time()
+        try:
+            manager = TableManager(tables_path, snapshot=snapshot)
+        except (OSError, ValueError) as e:
+            # e.g. the file is being rewritten, keep serving the previous tables
+            if _table_manager is None:
+                raise
+            print(f"Error reloading {tables_path}, keeping the previous tables: {e}")
+            return _table_manager
+
+        load_time = time.time() - start_time
+        _table_manager_stats["loads"] += 1
+        _table_manager_stats["load_time"] += load_time
+        _table_manager_stats["last_load_time"] = load_time
+        _table_manager_stats["last_loaded_at"] = time.time()
+        _table_manager_stats["last_source"] = "snapshot" if snapshot else "json"
+        print(f"Loaded {len(manager.tables)} tables from {snapshot.path if snapshot else tables_path} in {load_time * 1000:.1f}ms")
+
+        _table_manager, _table_manager_version = manager, (signature, digest)
+
+    return _table_manager
+
+
+def get_table_manager_stats() -> Dict[str, Any]:
+    """
+    Retrieves the load metrics of the shared TableManager.
+
+    Returns:
+        Dict[str, Any]: Number of loads, total and last load time in seconds, time and source of the last load and number of freshness checks.
+    """
+    return dict(_table_manager_stats)
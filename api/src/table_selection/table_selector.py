@@ -3,10 +3,10 @@ import time
 
 from typing import Dict, List, Tuple
 from openai import OpenAI, APIConnectionError
-from sentence_transformers import SentenceTransformer
 
-from config import OPENAI_KEY, TESSERACT_API
+from config import OPENAI_KEY, TESSERACT_API, TABLE_SELECTION_BACKEND
 from table_selection.table import Table, TableManager
+from utils.encoders import encode
 from utils.few_shot_examples import get_few_shot_example_messages
 from utils.preprocessors.text import extract_text_from_markdown_triple_backticks
 from utils.similarity_search import get_similar_tables
@@ -70,14 +70,41 @@ def get_relevant_tables_from_database(
     Returns:
         List[str]: List of table names.
     """
-    model = SentenceTransformer(embedding_model)
-    vector = model.encode([natural_language_query])
+    vector = encode([natural_language_query], embedding_model)
 
     results = get_similar_tables(vector, content_limit = content_limit)
 
     return list(results)
 
 
+def get_relevant_tables_from_index(
+        natural_language_query: str, 
+        table_manager: TableManager, 
+        content_limit: int = 1, 
+        embedding_model: str = 'multi-qa-MiniLM-L6-cos-v1'
+        ) -> List[str]:
+    """
+    Matches the user's question to a table using the description embeddings held by the TableManager, without querying the database.
+    The embeddings are computed the first time the TableManager is used with the given model.
+
+    Args:
+        natural_language_query (str): The user's question.
+        table_manager (TableManager): An instance of the TableManager class.
+        content_limit (int, optional): Number of table names to retrieve. Defaults to 1.
+        embedding_model (str, optional): The embedding model to use. Defaults to 'multi-qa-MiniLM-L6-cos-v1'.
+
+    Returns:
+        List[str]: List of table names.
+    """
+    if embedding_model not in table_manager.description_embeddings:
+        descriptions = [table.description or "" for table in table_manager.tables]
+        table_manager.set_description_embeddings(embedding_model, encode(descriptions, embedding_model))
+
+    vector = encode([natural_language_query], embedding_model)
+
+    return table_manager.get_similar_tables(vector[0], embedding_model, content_limit = content_limit)
+
+
 def get_relevant_tables_from_lm(
         natural_language_query: str, 
         table_manager: TableManager, 
@@ -194,7 +221,10 @@ def request_tables_to_lm_from_db(
             - A JSON object with all the parameters needed to build the API.
             - An updated token_tracker dictionary with new token usage information.
     """
-    db_tables = get_relevant_tables_from_database(natural_language_query, content_limit)
+    if TABLE_SELECTION_BACKEND == "memory":
+        db_tables = get_relevant_tables_from_index(natural_language_query, table_manager, content_limit)
+    else:
+        db_tables = get_relevant_tables_from_database(natural_language_query, content_limit)
     lm_table, token_tracker = get_relevant_tables_from_lm(natural_language_query, table_manager, db_tables, token_tracker)
     
     selected_table = table_manager.get_table(lm_table)
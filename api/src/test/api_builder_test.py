@@ -0,0 +1,101 @@
+from api_data_request.api import ApiBuilder, QuerySpec, add_year_range
+from table_selection.table import Table
+
+table = Table({
+    "name": "trade_i_baci_a_96",
+    "measures": [{"name": "Trade Value"}, {"name": "Quantity"}],
+    "dimensions": [],
+})
+
+
+def build(cuts, drilldowns, measures):
+    api = ApiBuilder(table=table, base_url="https://api.example.com/data.jsonrecords?")
+    api.add_drilldown(drilldowns)
+    api.add_measure(measures)
+    for key, value in cuts:
+        api.add_cut(key, value, value)
+    return api
+
+
+def test_build_api_is_canonical():
+    first = build([("Year", "2022"), ("Exporter Country", "saarg"), ("Year", "2021")], ["Year", "HS4"], ["Quantity", "Trade Value"])
+    second = build([("Exporter Country", "saarg"), ("Year", "2021"), ("Year", "2022")], ["HS4", "Year"], ["Trade Value", "Quantity"])
+
+    assert first.query_spec() == second.query_spec()
+    assert hash(first.query_spec()) == hash(second.query_spec())
+    assert first.build_api() == second.build_api() == (
+        "https://api.example.com/data.jsonrecords?cube=trade_i_baci_a_96"
+        "&Exporter Country=saarg&Year=2021,2022&drilldowns=HS4,Year"
+        "&measures=Quantity,Trade Value&sort=Trade Value.desc"
+    )
+
+
+def test_query_spec_defaults_to_year_drilldown():
+    assert QuerySpec(cube="trade_i_baci_a_96").to_query_string() == "cube=trade_i_baci_a_96&drilldowns=Year"
+
+
+years_table = Table({
+    "name": "trade_i_baci_a_96",
+    "measures": [{"name": "Trade Value"}],
+    "dimensions": [{"name": "Year", "hierarchies": [{"name": "Year", "levels": [
+        {"name": "Year", "members": [str(year) for year in range(1996, 2023)], "member_ids": list(range(1996, 2023))}
+    ]}]}],
+})
+
+
+def year_query(start_year, end_year, time_ranges=False):
+    api = ApiBuilder(table=years_table, base_url="https://api.example.com/data.jsonarrays?")
+    add_year_range(api, years_table, start_year, end_year, time_ranges=time_ranges)
+    return api
+
+
+def test_year_ranges_are_clamped_to_the_table():
+    api = year_query(1990, 1998)
+    assert api.cuts["Year"] == {"1996", "1997", "1998"}
+
+    api = year_query(1970, 2030)
+    assert "Year" not in api.cuts
+    assert api.drilldowns == {"Year"}
+
+
+def test_year_ranges_as_time_filter():
+    api = year_query(2018, 2030, time_ranges=True)
+    assert "Year" not in api.cuts
+    assert "&time=Year.latest.5&drilldowns=Year&" in api.build_api()
+
+    api = year_query(2015, 2018, time_ranges=True)
+    assert api.time is None
+    assert len(api.cuts["Year"]) == 4
+
+
+def test_year_ranges_outside_the_table_have_no_data():
+    for start_year, end_year in [(2025, None), (None, 1980), (1970, 1980)]:
+        api = year_query(start_year, end_year)
+        assert "Year" not in api.cuts
+        assert "the table has data for 1996-2022" in api.no_data
+        assert api.fetch_dataframe()[1] == api.no_data
+
+
+def test_inverted_year_ranges_are_not_swapped():
+    api = year_query(2020, 2010)
+    assert "Year" not in api.cuts
+    assert api.no_data.startswith("No data for the years 2020-2010")
+
+
+def test_year_range_context_without_cuts():
+    api = year_query(None, None)
+    assert api.drilldowns == set() and api.no_data is None
+
+    api = year_query(1990, None)
+    assert api.format_cuts_context() == "Year = 1996-2022"
+
+    api = year_query(2018, None, time_ranges=True)
+    assert api.format_cuts_context() == "Year = 2018-2022"
+
+
+def test_frontend_url_keeps_jsonrecords():
+    api = ApiBuilder(table=table, response_format="jsonarrays")
+    api.add_drilldown(["Year"])
+    # build_api is the url returned by the app to the frontend, which reads records
+    assert "/data.jsonrecords?cube=trade_i_baci_a_96&drilldowns=Year" in api.build_api()
+    assert api.fetch_url() == api.build_api().replace("/data.jsonrecords?", "/data.jsonarrays?")
@@ -0,0 +1,46 @@
+from functools import partialmethod
+
+import pandas as pd
+
+import app
+from api_data_request.api import ApiBuilder
+from table_selection.table import Table
+
+
+def level(name, count):
+    return {"name": name, "members": [f"{name} {i}" for i in range(count)], "member_ids": list(range(count))}
+
+
+table = Table({
+    "name": "trade_i_baci_a_96",
+    "measures": [{"name": "Trade Value"}],
+    "dimensions": [
+        {"name": "HS Product", "hierarchies": [{"name": "HS Product", "levels": [level("Section", 20), level("HS4", 1000)]}]},
+        {"name": "Exporter", "hierarchies": [{"name": "Geography", "levels": [{**level("Country", 200), "unique_name": "Exporter Country"}]}]},
+    ],
+})
+
+
+def get_api(monkeypatch, **preflight_kwargs):
+    monkeypatch.setattr(app, "get_api_params_from_lm", lambda query, table, token_tracker, model: (["HS4", "Exporter Country"], ["Trade Value"], [], None, token_tracker))
+    monkeypatch.setattr(app, "agent_answer", lambda token_tracker, **kwargs: ("Chile exported the most.", token_tracker))
+    monkeypatch.setattr(ApiBuilder, "fetch_dataframe", lambda self: (pd.DataFrame({"HS4": ["Copper"], "Trade Value": [1.0]}), ""))
+    if preflight_kwargs:
+        monkeypatch.setattr(ApiBuilder, "preflight", partialmethod(ApiBuilder.preflight, **preflight_kwargs))
+    return app.get_api("what did chile export?", step="get_api_params_from_lm", table=table, start_time=0)
+
+
+def test_large_queries_are_fetched_whole_by_default(monkeypatch):
+    api_url, records, response = get_api(monkeypatch)
+
+    assert "/data.jsonrecords?" in api_url and "limit=" not in api_url
+    assert records == [{"HS4": "Copper", "Trade Value": 1.0}]
+    assert response == "Chile exported the most."
+
+
+def test_limited_queries_are_explained_next_to_the_answer(monkeypatch):
+    api_url, _, response = get_api(monkeypatch, max_rows=5000, strategy="limit")
+
+    assert "limit=5000" in api_url
+    assert response.startswith("Chile exported the most.\n\n")
+    assert response.endswith("only the top 5000 are shown.")
@@ -0,0 +1,96 @@
+import pytest
+
+from utils.bulk_loader import BulkLoader, _IteratorFile
+
+
+def test_iterator_file_reads_across_chunks():
+    chunks = [b"abc", b"", b"defgh", b"ij"]
+    file = _IteratorFile(iter(chunks))
+
+    assert file.read(2) == b"ab"
+    assert file.read(4) == b"cdef"
+    assert file.read(8) == b"ghij"
+    assert file.read(8) == b""
+
+
+def test_iterator_file_reads_everything():
+    file = _IteratorFile(iter([b"abc", b"def"]))
+
+    assert file.read(1) == b"a"
+    assert file.read() == b"bcdef"
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        if self.connection.fail_on and query.startswith(self.connection.fail_on):
+            raise RuntimeError("failed")
+        self.connection.queries.append((query, params))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, fail_on=None):
+        self.queries = []
+        self.fail_on = fail_on
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeEngine:
+    def __init__(self, fail_on=None):
+        self.connection = FakeConnection(fail_on)
+
+    def raw_connection(self):
+        return self.connection
+
+
+def test_swap_replaces_unhashed_rows_of_the_loaded_scopes():
+    engine = FakeEngine()
+    loader = BulkLoader(engine, "public", "drilldowns", ["drilldown_id", "content_hash"])
+    loader.swap(delete_hashes=["abc"], delete_unhashed=[{"cube_name": "trade", "drilldown": "HS4"}])
+
+    deletes = [(query, params) for query, params in engine.connection.queries if query.startswith("DELETE")]
+    assert deletes == [
+        ("DELETE FROM public.drilldowns WHERE content_hash = ANY(%s)", (["abc"],)),
+        ("DELETE FROM public.drilldowns WHERE content_hash IS NULL AND cube_name = %s AND drilldown = %s", ("trade", "HS4")),
+    ]
+
+
+def test_failed_swap_drops_the_staging_table():
+    engine = FakeEngine(fail_on="INSERT")
+    loader = BulkLoader(engine, "public", "drilldowns", ["drilldown_id"])
+    with pytest.raises(RuntimeError):
+        loader.swap()
+
+    assert engine.connection.queries[-1] == (f"DROP TABLE IF EXISTS public.{loader.staging_name}", None)
+    assert engine.connection.closed
+
+
+def test_interrupted_load_drops_the_staging_table():
+    engine = FakeEngine()
+    with pytest.raises(KeyboardInterrupt):
+        with BulkLoader(engine, "public", "drilldowns", ["drilldown_id"]) as loader:
+            raise KeyboardInterrupt
+    assert engine.connection.queries[-1] == (f"DROP TABLE IF EXISTS public.{loader.staging_name}", None)
+
+    # a swapped loader is left as it is
+    engine = FakeEngine()
+    with BulkLoader(engine, "public", "drilldowns", ["drilldown_id"]) as loader:
+        loader.swap()
+    assert not any(query.startswith("DROP TABLE IF EXISTS") for query, _ in engine.connection.queries)
@@ -0,0 +1,34 @@
+from api_data_request.columnar import dataframe_to_records, decode_response, get_response_format, with_response_format
+
+records = [
+    {"Year": 2021, "Exporter Country": "Chile", "Trade Value": 1.5},
+    {"Year": 2022, "Exporter Country": "Argentina", "Trade Value": None},
+]
+
+
+def test_get_response_format():
+    assert get_response_format("https://oec.world/api/olap-proxy/data.csv?cube=trade") == "csv"
+    assert get_response_format("https://oec.world/api/olap-proxy/data.jsonarrays?") == "jsonarrays"
+    assert get_response_format("https://oec.world/api/olap-proxy/data?cube=trade") == "jsonrecords"
+
+
+def test_formats_decode_to_the_same_records():
+    jsonrecords = b'{"data": [{"Year": 2021, "Exporter Country": "Chile", "Trade Value": 1.5}, {"Year": 2022, "Exporter Country": "Argentina", "Trade Value": null}]}'
+    jsonarrays = b'{"columns": ["Year", "Exporter Country", "Trade Value"], "data": [[2021, "Chile", 1.5], [2022, "Argentina", null]]}'
+    csv = b'Year,Exporter Country,Trade Value\n2021,Chile,1.5\n2022,Argentina,\n'
+
+    for body, response_format in [(jsonrecords, "jsonrecords"), (jsonarrays, "jsonarrays"), (csv, "csv")]:
+        df = decode_response(body, response_format)
+        assert df["Year"].dtype == "int64"
+        assert dataframe_to_records(df) == records
+
+
+def test_missing_data_key():
+    assert decode_response(b'{"error": "Cube not found"}', "jsonarrays") is None
+    assert decode_response(b"", "csv").empty
+
+
+def test_with_response_format():
+    url = "https://oec.world/api/olap-proxy/data.jsonrecords?cube=trade&drilldowns=Year"
+    assert with_response_format(url, "csv") == "https://oec.world/api/olap-proxy/data.csv?cube=trade&drilldowns=Year"
+    assert with_response_format("https://oec.world/api/olap-proxy/data?cube=trade", "csv") == "https://oec.world/api/olap-proxy/data?cube=trade"
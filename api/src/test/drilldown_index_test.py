@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+
+from utils import drilldown_index
+from utils.drilldown_index import DrilldownIndex, write_full_precision_embeddings
+
+
+def build_index():
+    embeddings = np.array([
+        [1.0, 0.0, 0.0],
+        [0.0, 1.0, 0.0],
+        [0.7, 0.7, 0.0],
+        [1.0, 0.0, 0.0],
+    ])
+    return DrilldownIndex(
+        embeddings,
+        drilldown_ids=["chl", "arg", "per", "0901"],
+        drilldown_names=["Chile", "Argentina", "Peru", "Coffee"],
+        cube_names=["trade", "trade", "trade", "trade"],
+        drilldowns=["Exporter Country", "Exporter Country", "Exporter Country", "HS4"],
+        embedding_model="test",
+    )
+
+
+def test_search_filters_by_level():
+    index = build_index()
+    matches = index.search([1.0, 0.1, 0.0], "trade", ["Exporter Country"], content_limit=2)
+
+    assert [match[0] for match in matches] == ["chl", "per"]
+    assert matches[0][1] == "Exporter Country"
+    assert matches[0][3] == "Chile"
+
+
+def test_search_unknown_cube():
+    index = build_index()
+
+    assert index.search([1.0, 0.0, 0.0], "other_cube", ["Exporter Country"]) == []
+
+
+def test_quantized_search_matches_float32(tmp_path):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((200, 16))
+    kwargs = dict(
+        drilldown_ids=[str(i) for i in range(200)],
+        drilldown_names=[str(i) for i in range(200)],
+        cube_names=["trade"] * 200,
+        drilldowns=["HS4"] * 200,
+        embedding_model="test",
+    )
+    exact = DrilldownIndex(embeddings, **kwargs)
+    query = embeddings[42] + 0.01 * rng.standard_normal(16)
+
+    path = str(tmp_path / "full_precision.npy")
+    write_full_precision_embeddings(path, exact.embeddings, exact.fingerprint())
+
+    expected = exact.search(query, "trade", ["HS4"], content_limit=3)
+    for quantization in ["float16", "int8"]:
+        for full_precision_path, tolerance in [(None, 1e-2), (path, 1e-5)]:
+            index = DrilldownIndex(embeddings, quantization=quantization, full_precision_path=full_precision_path, **kwargs)
+            matches = index.search(query, "trade", ["HS4"], content_limit=3)
+
+            assert matches[0][0] == "42"
+            assert [match[0] for match in matches] == [match[0] for match in expected]
+            # the best candidates are rescored with the float32 embeddings of the file, or their dequantized embeddings
+            np.testing.assert_allclose([match[2] for match in matches], [match[2] for match in expected], rtol=tolerance)
+            assert (index.full_precision is not None) == (full_precision_path is not None)
+            assert index.nbytes <= exact.nbytes / 2
+
+
+def test_full_precision_file_of_other_members_is_ignored(tmp_path):
+    embeddings = np.eye(4)
+    kwargs = dict(cube_names=["trade"] * 4, drilldowns=["HS4"] * 4, embedding_model="test")
+    path = str(tmp_path / "full_precision.npy")
+    previous = DrilldownIndex(embeddings, drilldown_ids=list("abcd"), drilldown_names=list("abcd"), **kwargs)
+    write_full_precision_embeddings(path, previous.embeddings, previous.fingerprint())
+
+    # same number of rows, but a member replaced after a refresh
+    index = DrilldownIndex(embeddings, drilldown_ids=list("abce"), drilldown_names=list("abce"), quantization="int8", full_precision_path=path, **kwargs)
+    assert index.full_precision is None
+    assert index.search([0, 0, 0, 1], "trade", ["HS4"])[0][0] == "e"
+
+
+def test_from_schema_uses_member_ids(tmp_path, monkeypatch):
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps({"cubes": [{
+        "name": "trade",
+        "measures": [],
+        "dimensions": [{"name": "Exporter", "hierarchies": [{"name": "Geography", "levels": [
+            {"name": "Continent", "members": ["Americas"]},
+            {"name": "Country", "unique_name": "Exporter Country", "members": ["Chile", "Argentina"], "member_ids": ["chl", "arg"]},
+        ]}]}],
+    }]}))
+    monkeypatch.setattr(drilldown_index, "encode", lambda texts, model: np.array([[1.0, 0.0], [0.0, 1.0]][:len(texts)]))
+
+    index = DrilldownIndex.from_schema(str(path), "test")
+    assert len(index) == 2
+    assert index.search([0.0, 1.0], "trade", ["Exporter Country"]) == [("arg", "Exporter Country", 1.0, "Argentina")]
@@ -0,0 +1,21 @@
+import numpy as np
+
+from utils.embedding_cache import EmbeddingCache
+
+
+def test_unwritable_path_falls_back_to_memory(tmp_path):
+    cache = EmbeddingCache(max_size=10, path=str(tmp_path / "missing" / "embeddings.db"))
+    cache.set_many("model", [("chile", np.ones(3))])
+
+    assert cache.stats()["disk_enabled"] is False
+    assert np.array_equal(cache.get_many("model", ["chile"])["chile"], np.ones(3))
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache(max_size=10, path=path, max_disk_rows=2)
+    cache.set_many("model", [(text, np.ones(3)) for text in ["a", "b", "c"]])
+    cache.set_many("model", [("d", np.ones(3))], persist=False)
+
+    fresh = EmbeddingCache(max_size=10, path=path)
+    assert sorted(fresh.get_many("model", ["a", "b", "c", "d"])) == ["b", "c"]
@@ -0,0 +1,61 @@
+import difflib
+
+from api_data_request.member_resolver import MemberResolver, normalize_member
+from table_selection.table import Table
+
+table = Table({
+    "name": "trade_i_baci_a_96",
+    "measures": [{"name": "Trade Value"}],
+    "dimensions": [{
+        "name": "Exporter",
+        "default_hierarchy": "Geography",
+        "hierarchies": [{
+            "name": "Geography",
+            "levels": [{
+                "name": "Country",
+                "unique_name": "Exporter Country",
+                "members": ["United States", "Côte d'Ivoire", "Argentina"],
+                "member_ids": ["naus", "afciv", "saarg"],
+            }],
+        }],
+    }],
+})
+
+resolver = MemberResolver(table, aliases={"us": "United States"})
+
+
+def test_normalize_member():
+    assert normalize_member("  Côte d'Ivoire ") == "cote divoire"
+
+
+def test_exact_match():
+    assert resolver.resolve("argentina", ["Exporter Country"]) == ("saarg", "Exporter Country", 1.0, "Argentina")
+
+
+def test_alias_match():
+    assert resolver.resolve("U.S.", ["Exporter Country"])[0] == "naus"
+
+
+def test_fuzzy_match():
+    assert resolver.resolve("Argentinaa", ["Exporter Country"])[0] == "saarg"
+
+
+def test_unresolved():
+    assert resolver.resolve("copper", ["Exporter Country"]) is None
+
+
+def test_fuzzy_match_only_scores_close_candidates(monkeypatch):
+    names = [f"Product {i}" for i in range(1000)] + ["Copper Ore"]
+    large_table = Table({
+        "name": "trade_i_baci_a_96",
+        "measures": [{"name": "Trade Value"}],
+        "dimensions": [{"name": "HS Product", "hierarchies": [{"name": "HS Product", "levels": [
+            {"name": "HS4", "members": names, "member_ids": list(range(len(names)))}
+        ]}]}],
+    })
+    scored = []
+    sequence_matcher = difflib.SequenceMatcher
+    monkeypatch.setattr(difflib, "SequenceMatcher", lambda *args: scored.append(args) or sequence_matcher(*args))
+
+    assert MemberResolver(large_table, aliases={}).resolve("Coper Ore", ["HS4"])[3] == "Copper Ore"
+    assert len(scored) <= 10
@@ -0,0 +1,64 @@
+from api_data_request.api import ApiBuilder
+from api_data_request.query_cost import estimate_rows
+from table_selection.table import Table
+
+
+def level(name, count):
+    return {"name": name, "members": [f"{name} {i}" for i in range(count)], "member_ids": list(range(count))}
+
+
+table = Table({
+    "name": "trade_i_baci_a_96",
+    "measures": [{"name": "Trade Value"}],
+    "dimensions": [
+        {"name": "Year", "hierarchies": [{"name": "Year", "levels": [level("Year", 25)]}]},
+        {"name": "HS Product", "hierarchies": [{"name": "HS Product", "levels": [level("Section", 20), level("HS2", 100), level("HS4", 1000)]}]},
+        {"name": "Exporter", "hierarchies": [{"name": "Geography", "levels": [level("Continent", 5), {**level("Country", 200), "unique_name": "Exporter Country"}]}]},
+    ],
+})
+
+
+def build(drilldowns, cuts=(), measures=("Trade Value",)):
+    api = ApiBuilder(table=table, base_url="https://api.example.com/data.jsonarrays?", measures=list(measures))
+    api.add_drilldown(list(drilldowns))
+    for key, value in cuts:
+        api.add_cut(key, value, value)
+    return api
+
+
+def test_estimate_rows():
+    assert estimate_rows(table, ["HS4", "Exporter Country"], {}) == 200000
+    assert estimate_rows(table, ["HS4", "Year"], {"Year": ["2021", "2022"]}) == 2000
+    assert estimate_rows(table, ["HS4"], {"Section": ["1", "2"]}) == 100
+    assert estimate_rows(table, ["HS4", "Exporter Country"], {}, limit="10") == 10
+
+
+def test_preflight_limits_to_top_rows():
+    api = build(["HS4", "Exporter Country"])
+    cost = api.preflight(max_rows=5000, strategy="limit")
+    assert (cost.estimated_rows, cost.action) == (200000, "limited")
+    assert "limit=5000" in api.build_api()
+    assert "sort=Trade Value.desc" in api.build_api()
+    assert api.preflight(max_rows=5000).action == "ok"
+
+
+def test_preflight_coarsens_or_rejects():
+    api = build(["HS4", "Exporter Country"])
+    cost = api.preflight(max_rows=25000, strategy="coarsen")
+    assert cost.action == "coarsened"
+    assert api.drilldowns == {"HS2", "Exporter Country"}
+
+    api = build(["HS4", "Exporter Country"], cuts=[("Exporter Country", "chl"), ("Exporter Country", "arg")])
+    cost = api.preflight(max_rows=10, strategy="reject")
+    assert cost.action == "rejected"
+    assert "HS2 instead of HS4" in cost.message
+
+
+def test_preflight_counts_time_filters():
+    api = build(["HS4", "Year"])
+    api.time = "Year.latest.5"
+    assert api.preflight(max_rows=0).estimated_rows == 5000
+
+    # time filters other than latest/oldest are left out of the estimate
+    api.time = "Year.2020"
+    assert api.preflight(max_rows=0).estimated_rows == 25000
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+
+from utils.response_cache import ResponseCache
+
+
+def test_cache_serves_fresh_responses_of_the_same_version():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.set("trade|Year=2022", b'{"data": []}', "v1")
+
+    assert cache.get("trade|Year=2022", "v1") == b'{"data": []}'
+    assert cache.get("trade|Year=2021", "v1") is None
+    assert cache.get("trade|Year=2022", "v2") is None
+    assert cache.get("trade|Year=2022", "v1") is None
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["invalidated"] == 1
+    assert stats["misses"] == 3
+    assert stats["bytes_saved"] == len(b'{"data": []}')
+    assert stats["hit_ratio"] == 0.25
+
+
+def test_cache_expires_and_evicts():
+    cache = ResponseCache(max_entries=2, ttl=0.01)
+    cache.set("a", b"1")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+    cache = ResponseCache(max_entries=2, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.encode())
+    assert cache.get("a") is None
+    assert cache.stats()["memory_size"] == 2
+
+
+def test_disk_tier_survives_restarts():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "responses.db")
+        ResponseCache(ttl=60, path=path).set("trade", b'{"data": [1, 2, 3]}', "v1")
+
+        cache = ResponseCache(ttl=60, path=path)
+        assert cache.get("trade", "v1") == b'{"data": [1, 2, 3]}'
+        assert cache.get("trade", "v1") == b'{"data": [1, 2, 3]}'
+        assert cache.stats()["disk_hits"] == 1
+        assert cache.stats()["memory_hits"] == 1
+        cache.connection.close()
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    cache = ResponseCache(max_entries=10, ttl=60, max_bytes=10)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.encode() * 4)
+    cache.set("large", b"x" * 11)
+
+    assert [cache.get(key) is not None for key in ("a", "b", "c", "large")] == [False, True, True, False]
+    assert cache.stats()["memory_bytes"] == 8
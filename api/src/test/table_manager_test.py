@@ -0,0 +1,159 @@
+import json
+import os
+
+from table_selection.schema_model import load_schema
+from table_selection.table import Table, get_table_manager
+from utils.member_store import get_members_path, write_member_store
+
+
+def write_schema(path, cube_names):
+    with open(path, "w") as file:
+        json.dump({"cubes": [{"name": name, "measures": [], "dimensions": []} for name in cube_names]}, file)
+
+
+def test_table_manager_is_shared_and_reloaded(tmp_path):
+    path = str(tmp_path / "schema.json")
+    write_schema(path, ["trade_i_baci_a_92"])
+
+    manager = get_table_manager(path)
+    assert get_table_manager(path) is manager
+
+    # rewriting the file with the same content keeps the loaded tables, but changes their data version
+    data_version = manager.get_table("trade_i_baci_a_92").data_version
+    os.utime(path, ns=(0, 0))
+    assert get_table_manager(path) is manager
+    assert manager.get_table("trade_i_baci_a_92").data_version != data_version
+
+    write_schema(path, ["trade_i_baci_a_92", "trade_i_baci_a_96"])
+    os.utime(path, ns=(10**9, 10**9))
+    reloaded = get_table_manager(path)
+    assert reloaded is not manager
+    assert reloaded.list_tables() == ["trade_i_baci_a_92", "trade_i_baci_a_96"]
+
+
+def test_table_lookups():
+    table = Table({
+        "name": "trade_i_baci_a_96",
+        "measures": [],
+        "dimensions": [{
+            "name": "Exporter",
+            "hierarchies": [{
+                "name": "Geography",
+                "levels": [
+                    {"name": "Continent", "unique_name": "Exporter Continent", "members": ["Africa"]},
+                    {"name": "Country", "unique_name": "Exporter Country", "members": ["Chile"]},
+                ],
+            }],
+        }],
+    })
+
+    assert table.get_dimension_levels() == ["Exporter Continent", "Exporter Country"]
+    assert table.get_dimension_levels("Exporter") == ["Exporter Continent", "Exporter Country"]
+    assert table.get_dimension_levels("Country") == ["Exporter Continent", "Exporter Country"]
+    assert table.get_drilldown_members("Exporter Country") == ["Chile"]
+    assert table.get_drilldown_members("Importer Country") == []
+    assert table.prompt_get_dimensions("Exporter")[0]["levels"] == ["Exporter Continent", "Exporter Country"]
+
+
+def test_members_side_file(tmp_path):
+    schema = {"cubes": [{
+        "name": "trade_i_baci_a_96",
+        "measures": [],
+        "dimensions": [{
+            "name": "Year",
+            "hierarchies": [{
+                "name": "Year",
+                "levels": [{"name": "Year", "unique_name": None, "members": [2020, 2021], "member_ids": [2020, 2021]}],
+            }],
+        }],
+    }]}
+    path = str(tmp_path / "schema.json")
+    write_schema_with_members(path, schema)
+
+    manager = get_table_manager(path)
+    table = manager.get_table("trade_i_baci_a_96")
+
+    assert table.schema.dimensions[0].hierarchies[0].levels[0].members is None
+    assert table.get_drilldown_members("Year") == [2020, 2021]
+    assert table.get_drilldown_member_ids("Year") == [2020, 2021]
+
+
+def write_schema_with_members(path, schema):
+    schema = write_member_store(schema, get_members_path(path))
+    with open(path, "w") as file:
+        json.dump(schema, file)
+
+
+def test_prompt_renderings_are_cached(tmp_path):
+    path = str(tmp_path / "schema.json")
+    write_schema(path, ["trade_i_baci_a_92", "trade_i_baci_a_96"])
+    manager = get_table_manager(path)
+    table = manager.get_table("trade_i_baci_a_92")
+
+    assert table.prompt_schema_description() is table.prompt_schema_description()
+    assert manager.get_table_schemas(["trade_i_baci_a_96", "trade_i_baci_a_92"]) is manager.get_table_schemas(["trade_i_baci_a_92", "trade_i_baci_a_96"])
+
+    # list renderings are copied, so callers cannot change the cached value
+    table.prompt_get_dimensions().append({})
+    assert table.prompt_get_dimensions() == []
+
+    # renderings keyed by model-supplied names are bounded
+    for i in range(100):
+        table.prompt_get_dimensions(f"Dimension {i}")
+    assert len(table._rendered["prompt_get_dimensions"]) == 32
+
+
+def test_schema_model_interns_members(tmp_path):
+    level = {"name": "Country", "unique_name": "Exporter Country", "members": ["".join(["Chi", "le"])]}
+    schema = {"cubes": [
+        {"name": name, "measures": [], "dimensions": [{"name": "Exporter", "hierarchies": [{"name": "Geography", "levels": [dict(level)]}]}]}
+        for name in ["trade_i_baci_a_92", "trade_i_baci_a_96"]
+    ]}
+    path = str(tmp_path / "schema.json")
+    with open(path, "w") as file:
+        json.dump(schema, file)
+
+    first, second = load_schema(path)
+
+    assert first.dimensions[0].hierarchies[0].levels[0].level_name == "Exporter Country"
+    assert first.dimensions[0].hierarchies[0].levels[0].members[0] is second.dimensions[0].hierarchies[0].levels[0].members[0]
+
+
+def test_snapshot_is_used_when_current(tmp_path):
+    import numpy as np
+    from table_selection.schema_snapshot import get_snapshot_path, write_snapshot
+
+    path = str(tmp_path / "schema.json")
+    write_schema(path, ["trade_i_baci_a_92", "trade_i_baci_a_96"])
+    write_snapshot(path, get_snapshot_path(path), {"test": np.eye(2, dtype=np.float32)})
+
+    manager = get_table_manager(path)
+
+    assert manager.snapshot is not None
+    assert manager.list_tables() == ["trade_i_baci_a_92", "trade_i_baci_a_96"]
+    assert manager.get_similar_tables(np.array([0.0, 1.0]), "test") == ["trade_i_baci_a_96"]
+
+    # a schema changed after the snapshot was compiled is loaded from the JSON file
+    write_schema(path, ["trade_i_baci_a_92"])
+    os.utime(path, ns=(10**9, 10**9))
+    assert get_table_manager(path).snapshot is None
+
+
+def test_form_json_is_a_copy_of_the_template():
+    table = Table({
+        "name": "trade_i_baci_a_96",
+        "measures": [{"name": "Trade Value"}],
+        "dimensions": [{
+            "name": "Year",
+            "hierarchies": [{"name": "Year", "levels": [{"name": "Year", "members": [2019, 2021, 2020]}]}],
+        }],
+    })
+
+    form_json = table.get_form_json()
+    assert form_json["dimensions"] == {"Year": [2021]}
+    assert form_json["measures"] == ["Trade Value"]
+
+    form_json["dimensions"]["Year"].append(2020)
+    form_json["measures"].clear()
+    assert table.get_form_json()["dimensions"] == {"Year": [2021]}
+    assert table.measures == ["Trade Value"]
@@ -0,0 +1,38 @@
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.tesseract_client import TesseractClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"data": []}'
+        self.send_response(200 if self.path.startswith("/data") else 404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_client_records_calls():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    client = TesseractClient(retries=0)
+    assert client.get(f"{url}/data.jsonrecords?cube=trade").json() == {"data": []}
+    assert client.get(f"{url}/missing").status_code == 404
+    client.session.close()
+    server.shutdown()
+
+    stats = client.get_stats()
+    assert stats["calls"] == 2
+    assert stats["errors"] == 1
+    assert stats["bytes"] == 24
+    assert stats["recent"][0]["status"] == 200
+    assert stats["recent"][0]["url"] == f"{url}/data.jsonrecords"
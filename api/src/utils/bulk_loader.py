@@ -0,0 +1,256 @@
+import io
+import os
+import struct
+import time
+import uuid
+
+import numpy as np
+
+from typing import Dict, Iterator, List, Union
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+
+
+class _IteratorFile(io.RawIOBase):
+    """
+    File-like object over an iterator of byte chunks, so COPY can stream rows without building the whole payload.
+    """
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+        self.chunk = b""
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        # slices of the current chunk are taken from a read offset, so consumed bytes are never copied again
+        parts = []
+        remaining = size
+        while size < 0 or remaining > 0:
+            if self.position >= len(self.chunk):
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self.chunk, self.position = chunk, 0
+                continue
+            end = len(self.chunk) if size < 0 else min(len(self.chunk), self.position + remaining)
+            parts.append(self.chunk[self.position:end])
+            remaining -= end - self.position
+            self.position = end
+        return b"".join(parts)
+
+
+def _binary_rows(df, columns: List[str], vector_column: str, chunk_rows: int = 1000) -> Iterator[bytes]:
+    yield COPY_HEADER
+
+    field_count = struct.pack("!h", len(columns))
+    chunk = []
+    for row in df[columns].itertuples(index=False, name=None):
+        fields = [field_count]
+        for column, value in zip(columns, row):
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                fields.append(struct.pack("!i", -1))
+            elif column == vector_column:
+                # pgvector binary format: dimensions, unused, then big-endian float4 values
+                vector = np.asarray(value, dtype=">f4")
+                data = struct.pack("!hh", len(vector), 0) + vector.tobytes()
+                fields.append(struct.pack("!i", len(data)) + data)
+            else:
+                data = str(value).encode("utf-8")
+                fields.append(struct.pack("!i", len(data)) + data)
+        chunk.append(b"".join(fields))
+
+        if len(chunk) >= chunk_rows:
+            yield b"".join(chunk)
+            chunk = []
+
+    if chunk:
+        yield b"".join(chunk)
+    yield COPY_TRAILER
+
+
+def _text_value(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "\\N"
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return "[" + ",".join(str(float(x)) for x in value) + "]"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _text_rows(df, columns: List[str], chunk_rows: int = 1000) -> Iterator[bytes]:
+    chunk = []
+    for row in df[columns].itertuples(index=False, name=None):
+        chunk.append("\t".join(_text_value(value) for value in row) + "\n")
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk).encode("utf-8")
+            chunk = []
+    if chunk:
+        yield "".join(chunk).encode("utf-8")
+
+
+class BulkLoader:
+    """
+    Streams dataframes into a staging copy of a table with COPY, then moves them into the table in one transaction.
+    Used as a context manager, the staging table is dropped if the block exits without a successful swap.
+    """
+    def __init__(self, engine, schema_name: str, table_name: str, columns: List[str], vector_column: str = "embedding", binary: bool = True):
+        """
+        Initializes the BulkLoader and creates an empty staging table with the structure of the target table.
+
+        Args:
+            engine: SQLAlchemy engine of the database.
+            schema_name (str): Schema of the target table.
+            table_name (str): Name of the target table.
+            columns (List[str]): Columns to load, in order.
+            vector_column (str, optional): Column holding the pgvector embeddings. Defaults to "embedding".
+            binary (bool, optional): Use the binary COPY format, with text as fallback. Defaults to True.
+        """
+        self.engine = engine
+        self.schema_name = schema_name
+        self.table_name = table_name
+        # unique per loader, so concurrent loads into the same table do not share a staging table
+        self.staging_name = f"{table_name}_staging_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self.columns = columns
+        self.vector_column = vector_column
+        self.binary = binary
+        self.rows = 0
+        self.copy_time = 0.0
+        self.closed = False
+
+        self.connection = engine.raw_connection()
+        cursor = self.connection.cursor()
+        cursor.execute(f"CREATE TABLE {schema_name}.{self.staging_name} (LIKE {schema_name}.{table_name} INCLUDING ALL)")
+        cursor.close()
+        self.connection.commit()
+
+    def copy(self, df) -> int:
+        """
+        Streams the rows of a dataframe into the staging table.
+
+        Args:
+            df (DataFrame): Rows to load, with every column in `columns`.
+
+        Returns:
+            int: Number of rows copied.
+        """
+        if df.empty:
+            return 0
+
+        column_list = ", ".join(self.columns)
+        start_time = time.time()
+        cursor = self.connection.cursor()
+        try:
+            if self.binary:
+                try:
+                    cursor.copy_expert(
+                        f"COPY {self.schema_name}.{self.staging_name} ({column_list}) FROM STDIN WITH (FORMAT binary)",
+                        _IteratorFile(_binary_rows(df, self.columns, self.vector_column))
+                    )
+                except Exception as e:
+                    # e.g. a column whose binary representation is not text or vector
+                    print(f"Binary COPY failed, falling back to text: {e}")
+                    self.connection.rollback()
+                    self.binary = False
+
+            if not self.binary:
+                cursor.copy_expert(
+                    f"COPY {self.schema_name}.{self.staging_name} ({column_list}) FROM STDIN",
+                    _IteratorFile(_text_rows(df, self.columns))
+                )
+            self.connection.commit()
+        except Exception:
+            # the staging table keeps the rows of the previous copies, and the connection stays usable for the next ones
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        self.rows += len(df)
+        self.copy_time += time.time() - start_time
+        return len(df)
+
+    def swap(self, replace_cubes: List[str] = None, replace_all: bool = False, delete_hashes: List[str] = None, hash_column: str = "content_hash",
+             delete_unhashed: List[Dict[str, Union[str, List[str]]]] = None) -> Dict[str, float]:
+        """
+        Moves the staged rows into the target table in a single transaction and drops the staging table.
+        By default the rows are appended to the target table, after deleting the rows of replace_cubes and delete_hashes:
+        readers keep seeing the previous rows until the transaction commits, but the table itself is not swapped.
+        Only replace_all drops the target table and renames the staging table in its place.
+
+        Args:
+            replace_cubes (List[str], optional): Delete the existing rows of these cubes before inserting. Defaults to None (append).
+            replace_all (bool, optional): Replace the whole target table by the staging table, which then keeps its unique name
+                for its indexes and constraints. Defaults to False.
+            delete_hashes (List[str], optional): Delete the existing rows with these content hashes before inserting. Defaults to None.
+            hash_column (str, optional): Name of the content hash column. Defaults to "content_hash".
+            delete_unhashed (List[Dict[str, Union[str, List[str]]]], optional): Scopes, as column values, whose rows without a content hash
+                are deleted before inserting, e.g. the rows loaded before hashing of the levels reloaded in full. An empty scope matches
+                every row. Defaults to None.
+
+        Returns:
+            Dict[str, float]: Rows loaded, seconds spent on COPY and rows per second.
+        """
+        target = f"{self.schema_name}.{self.table_name}"
+        staging = f"{self.schema_name}.{self.staging_name}"
+        column_list = ", ".join(self.columns)
+
+        cursor = self.connection.cursor()
+        try:
+            if replace_all:
+                cursor.execute(f"DROP TABLE {target}")
+                cursor.execute(f"ALTER TABLE {staging} RENAME TO {self.table_name}")
+            else:
+                if replace_cubes:
+                    cursor.execute(f"DELETE FROM {target} WHERE cube_name = ANY(%s)", (list(replace_cubes),))
+                if delete_hashes:
+                    cursor.execute(f"DELETE FROM {target} WHERE {hash_column} = ANY(%s)", (list(delete_hashes),))
+                for scope in delete_unhashed or []:
+                    conditions = [f"{hash_column} IS NULL"] + [
+                        f"{column} = ANY(%s)" if isinstance(value, list) else f"{column} = %s" for column, value in scope.items()
+                    ]
+                    cursor.execute(f"DELETE FROM {target} WHERE {' AND '.join(conditions)}", tuple(scope.values()))
+                cursor.execute(f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM {staging}")
+                cursor.execute(f"DROP TABLE {staging}")
+            self.connection.commit()
+        except Exception:
+            cursor.close()
+            self.abort()
+            raise
+        cursor.close()
+        self.connection.close()
+        self.closed = True
+
+        stats = {
+            "rows": self.rows,
+            "copy_time": self.copy_time,
+            "rows_per_second": self.rows / self.copy_time if self.copy_time else 0.0,
+        }
+        print(f"Loaded {stats['rows']} rows into {target} ({stats['rows_per_second']:.0f} rows/s), deleted {len(delete_hashes or [])} stale rows")
+        return stats
+
+    def abort(self) -> None:
+        """
+        Drops the staging table without touching the target table, and closes the connection.
+        Does nothing once the loader was swapped or aborted.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.connection.rollback()
+            cursor = self.connection.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS {self.schema_name}.{self.staging_name}")
+            cursor.close()
+            self.connection.commit()
+        except Exception as e:
+            print(f"Error dropping the staging table {self.schema_name}.{self.staging_name}: {e}")
+        finally:
+            self.connection.close()
+
+    def __enter__(self) -> "BulkLoader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.abort()
@@ -0,0 +1,83 @@
+import hashlib
+
+import pandas as pd
+
+from sqlalchemy import text as sql_text
+from typing import Dict, List, Set, Tuple, Union
+
+
+def content_hash(*values) -> str:
+    """
+    Hashes the values that determine a row's embedding, so unchanged rows can be skipped on refresh.
+
+    Args:
+        *values: Values of the row, e.g. cube name, level, member id, member name and embedding model.
+
+    Returns:
+        str: Hex digest of the values.
+    """
+    return hashlib.sha1("\x1f".join(str(value) for value in values).encode("utf-8")).hexdigest()
+
+
+def add_content_hashes(df: pd.DataFrame, columns: List[str], model: str, hash_column: str = "content_hash") -> pd.DataFrame:
+    """
+    Adds the content hash of every row of a dataframe.
+
+    Args:
+        df (pd.DataFrame): Rows to hash.
+        columns (List[str]): Columns that are part of the hash, in order.
+        model (str): The embedding model, so a model change re-embeds every row.
+        hash_column (str, optional): Name of the hash column. Defaults to "content_hash".
+
+    Returns:
+        pd.DataFrame: The dataframe with the hash column.
+    """
+    df[hash_column] = [content_hash(*row, model) for row in df[columns].itertuples(index=False, name=None)]
+    return df
+
+
+def get_existing_hashes(engine, schema_name: str, table_name: str, filters: Dict[str, Union[str, List[str]]] = None, hash_column: str = "content_hash") -> Set[str]:
+    """
+    Retrieves the content hashes stored in a table. Rows without a hash (loaded before hashing or by other scripts) are ignored,
+    so their members come back as new: delete them in the same transaction with BulkLoader.swap(delete_unhashed=...).
+
+    Args:
+        engine: SQLAlchemy engine of the database.
+        schema_name (str): Schema of the table.
+        table_name (str): Name of the table.
+        filters (Dict[str, Union[str, List[str]]], optional): Column values the rows must match, e.g. cube_name and drilldown. A list matches any of its values. Defaults to None.
+        hash_column (str, optional): Name of the hash column. Defaults to "content_hash".
+
+    Returns:
+        Set[str]: The stored hashes.
+    """
+    filters = filters or {}
+    conditions = [f"{hash_column} IS NOT NULL"] + [
+        f"{column} = ANY(:{column})" if isinstance(value, list) else f"{column} = :{column}"
+        for column, value in filters.items()
+    ]
+    query = f"SELECT {hash_column} FROM {schema_name}.{table_name} WHERE {' AND '.join(conditions)}"
+
+    with engine.connect() as connection:
+        rows = connection.execute(sql_text(query), filters).fetchall()
+
+    return {row[0] for row in rows}
+
+
+def diff_content_hashes(df: pd.DataFrame, existing: Set[str], hash_column: str = "content_hash") -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Compares freshly hashed rows with the hashes already stored.
+
+    Args:
+        df (pd.DataFrame): Fresh rows, with their hash column.
+        existing (Set[str]): Hashes stored in the database for the same scope.
+        hash_column (str, optional): Name of the hash column. Defaults to "content_hash".
+
+    Returns:
+        Tuple[pd.DataFrame, List[str]]: The new or changed rows, and the stored hashes that vanished.
+    """
+    df = df.drop_duplicates(subset=[hash_column])
+    fresh = set(df[hash_column])
+    changed = df[~df[hash_column].isin(existing)]
+    vanished = sorted(existing - fresh)
+    return changed, vanished
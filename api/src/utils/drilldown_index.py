@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List, Tuple
+from sqlalchemy import text as sql_text
+
+from table_selection.table import TableManager
+from utils.encoders import encode
+
+
+class DrilldownIndex:
+    """
+    In-process nearest-neighbour index over drilldown members, filterable by cube and level.
+    """
+    def __init__(
+            self,
+            embeddings: np.ndarray,
+            drilldown_ids: List[str],
+            drilldown_names: List[str],
+            cube_names: List[str],
+            drilldowns: List[str],
+            embedding_model: str,
+            quantization: str = None,
+            rescore_factor: int = 4,
+            full_precision_path: str = None
+            ):
+        """
+        Initializes the DrilldownIndex.
+
+        Args:
+            embeddings (np.ndarray): Matrix with one embedding per member.
+            drilldown_ids (List[str]): Member ids, aligned with the embeddings.
+            drilldown_names (List[str]): Member names, aligned with the embeddings.
+            cube_names (List[str]): Cube of each member, aligned with the embeddings.
+            drilldowns (List[str]): Level of each member, aligned with the embeddings.
+            embedding_model (str): The model used to compute the embeddings.
+            quantization (str, optional): Keep the embeddings as "float16" or "int8" instead of float32. Defaults to None.
+            rescore_factor (int, optional): With quantization, candidates rescored per requested match. Defaults to 4.
+            full_precision_path (str, optional): With quantization, file written by write_full_precision_embeddings at setup,
+                memory-mapped for the rescoring step if it was written for the same members. Defaults to None
+                (the candidates are rescored with their dequantized embeddings, only the quantized copy is kept in memory).
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        embeddings = embeddings / norms
+
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.scales = None
+        self.full_precision = None
+
+        if quantization == "int8":
+            # symmetric quantization with one scale per member
+            scales = np.abs(embeddings).max(axis=1) / 127
+            scales[scales == 0] = 1
+            self.scales = scales.astype(np.float32)
+            self.embeddings = np.round(embeddings / scales[:, None]).astype(np.int8)
+        elif quantization == "float16":
+            self.embeddings = embeddings.astype(np.float16)
+        else:
+            self.embeddings = embeddings
+
+        self.drilldown_ids = np.asarray(drilldown_ids, dtype=object)
+        self.drilldown_names = np.asarray(drilldown_names, dtype=object)
+        self.cube_names = np.asarray(cube_names, dtype=object)
+        self.drilldowns = np.asarray(drilldowns, dtype=object)
+        self.embedding_model = embedding_model
+
+        # row positions of every (cube, level) pair, so a search only scores the allowed members
+        positions: Dict[Tuple[str, str], List[int]] = {}
+        for position, key in enumerate(zip(cube_names, drilldowns)):
+            positions.setdefault(key, []).append(position)
+        self.positions = {key: np.asarray(rows, dtype=np.int64) for key, rows in positions.items()}
+
+        if quantization and full_precision_path:
+            self.full_precision = _load_full_precision(full_precision_path, embeddings.shape, self.fingerprint())
+
+    def __len__(self) -> int:
+        return len(self.drilldown_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the embeddings of the index, in bytes (memory-mapped embeddings are not counted).
+        """
+        return self.embeddings.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def fingerprint(self) -> str:
+        """
+        Hashes the model and the members of the index in row order, so a full precision file is only used for the rows it was written for.
+
+        Returns:
+            str: Hex digest of the members.
+        """
+        digest = hashlib.sha1(self.embedding_model.encode("utf-8"))
+        for row in zip(self.cube_names, self.drilldowns, self.drilldown_ids, self.drilldown_names):
+            digest.update("\x1f".join(str(value) for value in row).encode("utf-8") + b"\x1e")
+        return digest.hexdigest()
+
+    @classmethod
+    def from_database(cls, engine, schema_name: str, table_name: str, embedding_model: str, cube_names: List[str] = None, **index_kwargs) -> "DrilldownIndex":
+        """
+        Builds the index from the drilldowns table.
+
+        Args:
+            engine: SQLAlchemy engine of the database.
+            schema_name (str): Schema of the drilldowns table.
+            table_name (str): Name of the drilldowns table.
+            embedding_model (str): The model used to compute the stored embeddings.
+            cube_names (List[str], optional): Only load the members of these cubes. Defaults to None (all cubes).
+            **index_kwargs: Quantization arguments of DrilldownIndex.
+
+        Returns:
+            DrilldownIndex: The index.
+        """
+        query = f"SELECT drilldown_id, drilldown_name, cube_name, drilldown, embedding FROM {schema_name}.{table_name}"
+        params = {}
+        if cube_names:
+            query += " WHERE cube_name = ANY(:cube_names)"
+            params["cube_names"] = list(cube_names)
+        # a stable row order, so the rows match the full precision file written at setup
+        query += " ORDER BY cube_name, drilldown, drilldown_id"
+
+        with engine.connect() as connection:
+            df = pd.read_sql_query(sql_text(query), connection, params=params)
+
+        df = df.dropna(subset=["embedding"])
+        embeddings = np.array([json.loads(vector) if isinstance(vector, str) else vector for vector in df["embedding"]], dtype=np.float32)
+
+        return cls(
+            embeddings,
+            df["drilldown_id"].astype(str).tolist(),
+            df["drilldown_name"].astype(str).tolist(),
+            df["cube_name"].tolist(),
+            df["drilldown"].tolist(),
+            embedding_model,
+            **index_kwargs
+        )
+
+    @classmethod
+    def from_schema(cls, tables_path: str, embedding_model: str, cube_names: List[str] = None, **index_kwargs) -> "DrilldownIndex":
+        """
+        Builds the index from the members stored in schema.json or its members side file.
+        Levels without stored member ids are skipped, as their members could not be sent as cuts.
+
+        Args:
+            tables_path (str): The path to the schema JSON file.
+            embedding_model (str): The model used to embed the members.
+            cube_names (List[str], optional): Only load the members of these cubes. Defaults to None (all cubes).
+            **index_kwargs: Quantization arguments of DrilldownIndex.
+
+        Returns:
+            DrilldownIndex: The index.
+        """
+        # members may live in the schema or in its members side file, the tables know where
+        manager = TableManager(tables_path)
+
+        ids, names, cubes, drilldowns = [], [], [], []
+        skipped_levels = []
+        for table in manager.tables:
+            if cube_names and table.name not in cube_names:
+                continue
+            for level_name in table.levels_by_name:
+                members = table.get_drilldown_members(level_name)
+                member_ids = table.get_drilldown_member_ids(level_name)
+                if not members:
+                    continue
+                if len(member_ids) != len(members):
+                    skipped_levels.append(f"{table.name}.{level_name}")
+                    continue
+                for member_id, member in zip(member_ids, members):
+                    ids.append(str(member_id))
+                    names.append(str(member))
+                    cubes.append(table.name)
+                    drilldowns.append(level_name)
+
+        if skipped_levels:
+            print(f"Skipped {len(skipped_levels)} levels without member ids in the drilldown index: {', '.join(skipped_levels)}")
+
+        embeddings = encode(names, embedding_model) if names else np.zeros((0, 1), dtype=np.float32)
+
+        return cls(embeddings, ids, names, cubes, drilldowns, embedding_model, **index_kwargs)
+
+    def search(self, vector, cube_name: str, drilldown_names: List[str], threshold: float = 0, content_limit: int = 1) -> List[Tuple[str, str, float, str]]:
+        """
+        Looks for the members most similar to the given embedding, among the members of the given cube and levels.
+
+        Args:
+            vector: Embedding of the text to match.
+            cube_name (str): The name of the cube.
+            drilldown_names (List[str]): Levels the member can belong to.
+            threshold (float, optional): Minimum cosine similarity. Defaults to 0.
+            content_limit (int, optional): Number of matches to return. Defaults to 1.
+
+        Returns:
+            List[Tuple[str, str, float, str]]: Matches as (drilldown_id, drilldown, similarity, drilldown_name), best first.
+        """
+        rows = [self.positions[(cube_name, name)] for name in drilldown_names if (cube_name, name) in self.positions]
+        if not rows:
+            return []
+        rows = np.concatenate(rows)
+
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        if self.quantization:
+            # coarse scores on the quantized embeddings, then exact scores for the best candidates only
+            candidates = content_limit * self.rescore_factor
+            similarities = self._coarse_scores(rows, query)
+            if len(rows) > candidates:
+                rows = rows[np.argpartition(-similarities, candidates - 1)[:candidates]]
+            similarities = self._rescore(rows, query)
+        else:
+            similarities = self.embeddings[rows] @ query
+
+        mask = similarities > threshold
+        rows, similarities = rows[mask], similarities[mask]
+
+        if len(rows) > content_limit:
+            top = np.argpartition(-similarities, content_limit - 1)[:content_limit]
+            rows, similarities = rows[top], similarities[top]
+        order = np.argsort(-similarities)
+
+        return [
+            (self.drilldown_ids[rows[i]], self.drilldowns[rows[i]], float(similarities[i]), self.drilldown_names[rows[i]])
+            for i in order
+        ]
+
+    def _coarse_scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self.quantization == "int8":
+            query_scale = max(np.abs(query).max() / 127, 1e-12)
+            quantized_query = np.round(query / query_scale).astype(np.int32)
+            return (self.embeddings[rows].astype(np.int32) @ quantized_query) * self.scales[rows] * query_scale
+        return self.embeddings[rows].astype(np.float32) @ query
+
+    def _rescore(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self.full_precision is None:
+            # without the full precision file, the candidates are scored with their dequantized embeddings and the exact query
+            candidates = self.embeddings[rows].astype(np.float32)
+            if self.scales is not None:
+                candidates *= self.scales[rows, None]
+            return candidates @ query
+
+        # sorted reads keep the memory-mapped access sequential
+        order = np.argsort(rows)
+        scores = np.empty(len(rows), dtype=np.float32)
+        scores[order] = np.asarray(self.full_precision[rows[order]]) @ query
+        return scores
+
+
+def write_full_precision_embeddings(path: str, embeddings: np.ndarray, fingerprint: str):
+    """
+    Writes the normalized float32 embeddings of an index to the file memory-mapped by quantized indexes for rescoring,
+    with the fingerprint of its members in a side file (path + ".fingerprint").
+    Meant to run once at setup: the file is written next to its destination and moved in place,
+    so workers that have the previous version mapped keep reading it.
+
+    Args:
+        path (str): The path of the .npy file.
+        embeddings (np.ndarray): The embeddings, in the row order of the index, e.g. DrilldownIndex.embeddings of a float32 index.
+        fingerprint (str): DrilldownIndex.fingerprint() of the index.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        np.save(file, embeddings / norms)
+
+    # the previous fingerprint is removed first, so a worker loading in between never pairs it with the new rows
+    fingerprint_path = path + ".fingerprint"
+    if os.path.exists(fingerprint_path):
+        os.remove(fingerprint_path)
+    os.replace(tmp_path, path)
+    with open(fingerprint_path + ".tmp", "w") as file:
+        file.write(fingerprint)
+    os.replace(fingerprint_path + ".tmp", fingerprint_path)
+
+
+def _read_fingerprint(path: str) -> str:
+    try:
+        with open(path + ".fingerprint") as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def _load_full_precision(path: str, shape: Tuple[int, int], fingerprint: str):
+    # the fingerprint is read before and after mapping the file, so a file replaced meanwhile is not used
+    stored_fingerprint = _read_fingerprint(path)
+    if stored_fingerprint != fingerprint or not os.path.exists(path):
+        print(f"Full precision embeddings at {path} missing or written for other members, rescoring with the dequantized embeddings")
+        return None
+    full_precision = np.load(path, mmap_mode="r")
+    if full_precision.shape != shape or _read_fingerprint(path) != fingerprint:
+        print(f"Full precision embeddings at {path} changed while loading, rescoring with the dequantized embeddings")
+        return None
+    return full_precision
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_drilldown_index(source: str, embedding_model: str, **kwargs) -> DrilldownIndex:
+    """
+    Retrieves the process-wide drilldown index, building it the first time it is requested.
+
+    Args:
+        source (str): Where to build the index from, "database" or "schema".
+        embedding_model (str): The embedding model of the index.
+        **kwargs: Arguments for DrilldownIndex.from_database or DrilldownIndex.from_schema.
+
+    Returns:
+        DrilldownIndex: The shared index.
+    """
+    global _index
+
+    if _index is not None and _index.embedding_model == embedding_model:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index.embedding_model != embedding_model:
+            start_time = time.time()
+            if source == "schema":
+                _index = DrilldownIndex.from_schema(embedding_model=embedding_model, **kwargs)
+            else:
+                _index = DrilldownIndex.from_database(embedding_model=embedding_model, **kwargs)
+            print(f"Built drilldown index from {source} with {len(_index)} members ({_index.nbytes / 2**20:.1f} MiB) in {time.time() - start_time:.2f}s")
+
+    return _index
@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes a text before it is embedded, so equivalent strings share a cache entry.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The text in NFC form, without leading, trailing or repeated whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: a bounded in-memory LRU backed by an optional SQLite file that survives restarts.
+    The SQLite file is opened on first use, and any error on it (read-only directory, locked database) leaves the cache in memory only.
+    """
+    def __init__(self, max_size: int = 10000, path: str = None, max_disk_rows: int = 100000, timeout: float = 5):
+        """
+        Initializes the EmbeddingCache.
+
+        Args:
+            max_size (int): Maximum number of embeddings kept in memory.
+            path (str, optional): Path to the SQLite file of the on-disk tier. Defaults to None (memory only).
+            max_disk_rows (int, optional): Maximum number of embeddings kept on disk, the oldest are deleted first. Defaults to 100000.
+            timeout (float, optional): Seconds to wait for a lock held by another process on the SQLite file. Defaults to 5.
+        """
+        self.max_size = max_size
+        self.path = path
+        self.max_disk_rows = max_disk_rows
+        self.timeout = timeout
+        self.memory: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        # also serializes every use of the SQLite connection, which is shared by the threads of the process
+        self.lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_errors": 0}
+
+        self.connection = None
+        self.disk_enabled = bool(path)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        # called with the lock held
+        if self.connection is None and self.disk_enabled:
+            try:
+                self.connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+                self.connection.execute("CREATE TABLE IF NOT EXISTS embeddings (model text, text text, vector blob, PRIMARY KEY (model, text))")
+                self.connection.commit()
+            except sqlite3.Error as e:
+                self._disable(e)
+        return self.connection
+
+    def _disable(self, error: Exception) -> None:
+        print(f"Embedding cache file {self.path} unavailable, caching in memory only: {error}")
+        self.counters["disk_errors"] += 1
+        self.disk_enabled = False
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except sqlite3.Error:
+                pass
+            self.connection = None
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, model_name: str, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Retrieves the cached embeddings of the given (normalized) texts.
+
+        Args:
+            model_name (str): The name of the embedding model.
+            texts (Iterable[str]): Normalized texts to look up.
+
+        Returns:
+            Dict[str, np.ndarray]: Embeddings found, keyed by text.
+        """
+        found = {}
+        with self.lock:
+            on_disk = []
+            for text in set(texts):
+                vector = self.memory.get((model_name, text))
+                if vector is not None:
+                    self.memory.move_to_end((model_name, text))
+                    found[text] = vector
+                    self.counters["memory_hits"] += 1
+                else:
+                    on_disk.append(text)
+
+            if on_disk and self._connect() is not None:
+                try:
+                    for start in range(0, len(on_disk), 500):
+                        chunk = on_disk[start:start + 500]
+                        rows = self.connection.execute(
+                            "SELECT text, vector FROM embeddings WHERE model = ? AND text IN ({})".format(",".join("?" * len(chunk))),
+                            [model_name, *chunk]
+                        ).fetchall()
+                        for text, blob in rows:
+                            vector = np.frombuffer(blob, dtype=np.float32)
+                            found[text] = vector
+                            self._remember((model_name, text), vector)
+                            self.counters["disk_hits"] += 1
+                except sqlite3.Error as e:
+                    self._disable(e)
+
+            self.counters["misses"] += len(on_disk) - sum(1 for text in on_disk if text in found)
+
+        return found
+
+    def set_many(self, model_name: str, items: List[Tuple[str, np.ndarray]], persist: bool = True) -> None:
+        """
+        Stores embeddings in memory and, if persist is set, on disk.
+
+        Args:
+            model_name (str): The name of the embedding model.
+            items (List[Tuple[str, np.ndarray]]): Pairs of normalized text and embedding.
+            persist (bool, optional): Also write them to the on-disk tier. Defaults to True.
+        """
+        with self.lock:
+            rows = []
+            for text, vector in items:
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember((model_name, text), vector)
+                rows.append((model_name, text, vector.tobytes()))
+
+            if persist and rows and self._connect() is not None:
+                try:
+                    self.connection.executemany("INSERT OR REPLACE INTO embeddings (model, text, vector) VALUES (?, ?, ?)", rows)
+                    # replaced rows get a new rowid, so the lowest rowids are the oldest embeddings
+                    excess = self.connection.execute("SELECT count(*) FROM embeddings").fetchone()[0] - self.max_disk_rows
+                    if excess > 0:
+                        self.connection.execute("DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)", (excess,))
+                    self.connection.commit()
+                except sqlite3.Error as e:
+                    self._disable(e)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit and miss counters of the cache.
+
+        Returns:
+            Dict[str, int]: Hits per tier, misses and number of embeddings held in memory.
+        """
+        with self.lock:
+            stats = dict(self.counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            stats["memory_size"] = len(self.memory)
+            stats["disk_enabled"] = self.disk_enabled
+        return stats
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import numpy as np
+
+from sentence_transformers import SentenceTransformer
+from typing import Dict, List, Union
+
+from config import EMBEDDINGS_CACHE_DISK_ROWS, EMBEDDINGS_CACHE_PATH, EMBEDDINGS_CACHE_SIZE
+from utils.embedding_cache import EmbeddingCache, normalize_text
+
+_encoders: Dict[str, SentenceTransformer] = {}
+_registry_lock = threading.Lock()
+_model_locks: Dict[str, threading.Lock] = {}
+
+_stats = {
+    "loads": 0,
+    "load_time": 0.0,
+    "encodes": 0,
+    "encoded_texts": 0,
+    "encode_time": 0.0,
+}
+_stats_lock = threading.Lock()
+
+# the SQLite file is only opened by the first lookup
+_cache = EmbeddingCache(max_size=EMBEDDINGS_CACHE_SIZE, path=EMBEDDINGS_CACHE_PATH, max_disk_rows=EMBEDDINGS_CACHE_DISK_ROWS)
+
+
+def _get_model_lock(model_name: str) -> threading.Lock:
+    with _registry_lock:
+        if model_name not in _model_locks:
+            _model_locks[model_name] = threading.Lock()
+        return _model_locks[model_name]
+
+
+def get_encoder(model_name: str) -> SentenceTransformer:
+    """
+    Retrieves the SentenceTransformer for the given model, loading it only the first time it is requested.
+
+    Args:
+        model_name (str): The name of the embedding model.
+
+    Returns:
+        SentenceTransformer: The shared encoder instance.
+    """
+    encoder = _encoders.get(model_name)
+    if encoder is not None:
+        return encoder
+
+    # one lock per model, so loading mpnet does not block requests that only need MiniLM
+    with _get_model_lock(model_name):
+        encoder = _encoders.get(model_name)
+        if encoder is None:
+            start_time = time.time()
+            encoder = SentenceTransformer(model_name)
+            elapsed = time.time() - start_time
+            _encoders[model_name] = encoder
+
+            with _stats_lock:
+                _stats["loads"] += 1
+                _stats["load_time"] += elapsed
+            print(f"Loaded embedding model {model_name} in {elapsed:.2f}s")
+
+    return encoder
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Returns the process-wide embedding cache.
+
+    Returns:
+        EmbeddingCache: The shared cache.
+    """
+    return _cache
+
+
+def encode(texts: Union[str, List[str]], model_name: str, persist: bool = True):
+    """
+    Computes the embeddings of the given texts with the shared encoder of the model.
+    Texts are normalized and looked up in the embedding cache first, only the missing ones are encoded.
+
+    Args:
+        texts (Union[str, List[str]]): Text or list of texts to encode.
+        model_name (str): The name of the embedding model.
+        persist (bool, optional): Write the new embeddings to the on-disk tier of the cache, off for bulk loads. Defaults to True.
+
+    Returns:
+        numpy.ndarray: The embeddings, one row per text.
+    """
+    if isinstance(texts, str):
+        texts = [texts]
+
+    keys = [normalize_text(text) for text in texts]
+    vectors = _cache.get_many(model_name, keys)
+
+    missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+    if missing:
+        encoder = get_encoder(model_name)
+
+        start_time = time.time()
+        embeddings = encoder.encode(missing)
+        elapsed = time.time() - start_time
+
+        with _stats_lock:
+            _stats["encodes"] += 1
+            _stats["encoded_texts"] += len(missing)
+            _stats["encode_time"] += elapsed
+
+        _cache.set_many(model_name, list(zip(missing, embeddings)), persist=persist)
+        vectors.update(zip(missing, np.asarray(embeddings, dtype=np.float32)))
+
+    return np.vstack([vectors[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+
+def preload_encoders(model_names: List[str]) -> None:
+    """
+    Loads the given models into the registry, so the first request does not pay the loading time.
+
+    Args:
+        model_names (List[str]): Names of the embedding models to load.
+    """
+    for model_name in model_names:
+        get_encoder(model_name)
+
+
+def get_encoder_stats() -> Dict[str, Union[int, float, List[str]]]:
+    """
+    Returns the load and encode counters of the registry.
+
+    Returns:
+        Dict[str, Union[int, float, List[str]]]: Number of model loads and encode calls, the time spent on each, the loaded models and the embedding cache counters.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["models"] = list(_encoders.keys())
+    stats["cache"] = _cache.stats()
+    return stats
@@ -1,13 +1,14 @@
 import datetime
 import json
 import jwt
-import requests
 import re
 
+from utils.tesseract_client import get_tesseract_client
+
 
 def request_to_tesseract(endpoint, auth=None):
     """
-    Make a request to the tesseract api endpoint.
+    Make a request to the tesseract api endpoint, through the shared connection pool.
     If you want to make a request with authentication required, please add as a second parameter to the function call the TESSERACT_API_SECRET variable.
     """
 
@@ -26,9 +27,9 @@ def request_to_tesseract(endpoint, auth=None):
 
         headers = {"x-tesseract-jwt-token": jwt_token}
 
-        response = requests.get(endpoint, headers=headers)
+        response = get_tesseract_client().get(endpoint, headers=headers)
     else:
-        response = requests.get(endpoint)
+        response = get_tesseract_client().get(endpoint)
 
     return response
 
@@ -57,8 +58,8 @@ def keys_to_tuple(input_dict):
 
 
 def set_to_json(input_set):
-    # Convert set to list
-    result_list = list(input_set)
+    # Convert set to a sorted list, so the same set is always logged the same way
+    result_list = sorted(input_set)
 
     # Serialize the list to JSON
     json_data = json.dumps(result_list, default=list)
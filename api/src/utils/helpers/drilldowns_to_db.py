@@ -1,9 +1,9 @@
 import pandas as pd
-import requests
 import urllib.parse
 
 from config import POSTGRES_ENGINE
 from utils.similarity_search import embedding
+from utils.tesseract_client import get_tesseract_client
 
 def create_table():
     POSTGRES_ENGINE.execute("CREATE TABLE IF NOT EXISTS datausa_drilldowns.drilldowns (product_id text, product_name text, cube_name text, drilldown text, embedding vector(384))") 
@@ -12,7 +12,7 @@ def create_table():
 
 def get_data_from_api(api_url):
     try:
-        r = requests.get(api_url)
+        r = get_tesseract_client().get(api_url)
         df = pd.DataFrame.from_dict(r.json()['data'])
     except: raise ValueError('Invalid API url:', api_url)
 
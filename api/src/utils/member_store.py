@@ -0,0 +1,150 @@
+import json
+import mmap
+import os
+import struct
+import threading
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+MAGIC = b"MEMBERS1"
+HEADER = struct.Struct("!8sQ")
+
+
+def get_members_path(tables_path: str) -> str:
+    """
+    Returns the path of the members side file that goes with a schema JSON file, e.g. schema.json -> schema_members.bin.
+    """
+    return os.path.splitext(tables_path)[0] + "_members.bin"
+
+
+def encode_member_store(schema_json: Dict) -> bytes:
+    """
+    Moves the members of every level of the schema into a members blob, leaving only metadata in the schema.
+    The blob holds a header with the offset index, then one compact JSON block per (cube, level), sorted by cube and level.
+
+    Args:
+        schema_json (Dict): The schema, with "members" and "member_ids" in its levels. They are removed in place.
+
+    Returns:
+        bytes: The members blob.
+    """
+    blocks = {}
+    for cube in schema_json["cubes"]:
+        for dimension in cube["dimensions"]:
+            for hierarchy in dimension["hierarchies"]:
+                for level in hierarchy["levels"]:
+                    members = level.pop("members", None)
+                    member_ids = level.pop("member_ids", None)
+                    if members is None:
+                        continue
+                    level_name = level.get("unique_name") or level["name"]
+                    blocks.setdefault((cube["name"], level_name), (members, member_ids or []))
+
+    index = {}
+    data = []
+    offset = 0
+    for (cube_name, level_name), (members, member_ids) in sorted(blocks.items()):
+        block = json.dumps([members, member_ids], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index.setdefault(cube_name, {})[level_name] = [offset, len(block), len(members)]
+        data.append(block)
+        offset += len(block)
+
+    header = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(MAGIC, len(header)) + header + b"".join(data)
+
+
+def write_member_store(schema_json: Dict, path: str) -> Dict:
+    """
+    Moves the members of every level of the schema into a side file, leaving only metadata in the schema.
+
+    Args:
+        schema_json (Dict): The schema, with "members" and "member_ids" in its levels. They are removed in place.
+        path (str): The path of the side file.
+
+    Returns:
+        Dict: The schema without members.
+    """
+    blob = encode_member_store(schema_json)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(blob)
+    # readers never see a half-written file
+    os.replace(tmp_path, path)
+
+    return schema_json
+
+
+class MemberStore:
+    """
+    Read-only access to the members side file. The file is memory-mapped and a level is only decoded when requested,
+    so the members of the levels that are never used are not held in memory.
+    """
+    def __init__(self, path: str, cache_size: int = 64, offset: int = 0):
+        """
+        Initializes the MemberStore.
+
+        Args:
+            path (str): The path of the side file.
+            cache_size (int, optional): Number of decoded levels kept in memory. Defaults to 64.
+            offset (int, optional): Position of the members blob in the file, when it is embedded in a larger file. Defaults to 0.
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = HEADER.unpack_from(self.mmap, offset)
+        if magic != MAGIC:
+            raise ValueError(f"{path} does not hold a members blob at {offset}")
+        self.data_offset = offset + HEADER.size + header_size
+        self.index = json.loads(self.mmap[offset + HEADER.size:self.data_offset].decode("utf-8"))
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        cube_name, level_name = key
+        return level_name in self.index.get(cube_name, {})
+
+    def count(self, cube_name: str, level_name: str) -> int:
+        """
+        Returns the number of members of a level without decoding them.
+        """
+        entry = self.index.get(cube_name, {}).get(level_name)
+        return entry[2] if entry else 0
+
+    def get(self, cube_name: str, level_name: str) -> Tuple[List[str], List[str]]:
+        """
+        Retrieves the members of a level.
+
+        Args:
+            cube_name (str): The name of the cube.
+            level_name (str): The unique name of the level, or its name if it has none.
+
+        Returns:
+            Tuple[List[str], List[str]]: The member labels and the aligned member ids, empty if the level is not stored.
+        """
+        key = (cube_name, level_name)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        entry = self.index.get(cube_name, {}).get(level_name)
+        if entry is None:
+            return [], []
+
+        offset, size, _ = entry
+        start = self.data_offset + offset
+        members, member_ids = json.loads(self.mmap[start:start + size].decode("utf-8"))
+
+        with self.lock:
+            self.cache[key] = (members, member_ids)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return members, member_ids
+
+    def close(self):
+        self.mmap.close()
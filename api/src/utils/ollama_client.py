@@ -0,0 +1,93 @@
+import requests
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from typing import List, Optional
+from urllib3.util.retry import Retry
+
+
+class OllamaEmbeddingClient:
+    """
+    Concurrent client for the Ollama embeddings endpoint, with a keep-alive connection pool and retries.
+    """
+    def __init__(
+            self,
+            api_url: str,
+            model: str,
+            max_workers: int = 8,
+            batch_size: int = 32,
+            retries: int = 3,
+            timeout: float = 60,
+            use_batch_endpoint: bool = False
+            ):
+        """
+        Initializes the OllamaEmbeddingClient.
+
+        Args:
+            api_url (str): Base URL of the Ollama API (OLLAMA_API).
+            model (str): The name of the embedding model.
+            max_workers (int, optional): Maximum number of requests in flight. Defaults to 8.
+            batch_size (int, optional): Number of texts handled by each task. Defaults to 32.
+            retries (int, optional): Retries per request on connection errors and 429/5xx responses. Defaults to 3.
+            timeout (float, optional): Timeout of each request, in seconds. Defaults to 60.
+            use_batch_endpoint (bool, optional): Send each batch in a single request to the `embed` endpoint
+                (Ollama >= 0.3) instead of one request per text to `embeddings`. Defaults to False.
+        """
+        self.api_url = api_url
+        self.model = model
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.use_batch_endpoint = use_batch_endpoint
+
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["POST"])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        if self.use_batch_endpoint:
+            response = self.session.post(f"{self.api_url}embed", json={"model": self.model, "input": texts}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json().get("embeddings", [None] * len(texts))
+
+        embeddings = []
+        for text in texts:
+            response = self.session.post(f"{self.api_url}embeddings", json={"model": self.model, "prompt": text}, timeout=self.timeout)
+            response.raise_for_status()
+            embeddings.append(response.json().get("embedding"))
+        return embeddings
+
+    def embed(self, texts: List[str], progress: bool = True) -> List[Optional[List[float]]]:
+        """
+        Computes the embeddings of the given texts.
+
+        Args:
+            texts (List[str]): Texts to embed.
+            progress (bool, optional): Show a progress bar. Defaults to True.
+
+        Returns:
+            List[Optional[List[float]]]: One embedding per text, in the same order. None for the texts whose batch failed.
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        batches = [(start, texts[start:start + self.batch_size]) for start in range(0, len(texts), self.batch_size)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, \
+                tqdm(total=len(texts), desc=f"Embedding with {self.model}", disable=not progress) as progress_bar:
+            futures = {executor.submit(self._embed_batch, batch): (start, batch) for start, batch in batches}
+
+            for future in as_completed(futures):
+                start, batch = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"Error embedding texts {start} to {start + len(batch) - 1}: {e}")
+                    results = [None] * len(batch)
+
+                embeddings[start:start + len(batch)] = results
+                progress_bar.update(len(batch))
+
+        return embeddings
@@ -0,0 +1,185 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import RESPONSE_CACHE_BYTES, RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+
+
+class ResponseCache:
+    """
+    Two-tier cache of Tesseract response bodies: an in-memory LRU bounded by entries and bytes, with a time to live,
+    backed by an optional SQLite file holding the bodies compressed with zlib.
+    Every entry records the data version of its cube, and is dropped when the cube's version changes.
+    """
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, path: str = None, compress_level: int = 6, max_bytes: int = 64 * 2**20):
+        """
+        Initializes the ResponseCache.
+
+        Args:
+            max_entries (int, optional): Maximum number of responses kept in memory. Defaults to 256.
+            max_bytes (int, optional): Maximum size of the response bodies kept in memory, larger bodies are only kept on disk. Defaults to 64 MiB.
+            ttl (float, optional): Seconds a response stays valid. Defaults to 3600.
+            path (str, optional): Path to the SQLite file of the on-disk tier. Defaults to None (memory only).
+            compress_level (int, optional): zlib level of the on-disk bodies. Defaults to 6.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.compress_level = compress_level
+        self.max_bytes = max_bytes
+        self.memory: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "bytes_saved": 0}
+
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS responses (key text PRIMARY KEY, version text, expires_at real, body blob)")
+            self.connection.commit()
+
+    @staticmethod
+    def hash_key(canonical_key: str) -> str:
+        return hashlib.sha1(canonical_key.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, entry: Tuple[float, str, bytes]) -> None:
+        self._forget(key)
+        if len(entry[2]) > self.max_bytes:
+            return
+        self.memory[key] = entry
+        self.memory_bytes += len(entry[2])
+        while len(self.memory) > self.max_entries or self.memory_bytes > self.max_bytes:
+            _, (_, _, body) = self.memory.popitem(last=False)
+            self.memory_bytes -= len(body)
+
+    def _forget(self, key: str) -> None:
+        entry = self.memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= len(entry[2])
+
+    def _check(self, entry: Tuple[float, str, bytes], version: str) -> Optional[bytes]:
+        expires_at, entry_version, body = entry
+        if entry_version != version:
+            self.counters["invalidated"] += 1
+            return None
+        if expires_at < time.time():
+            self.counters["expired"] += 1
+            return None
+        return body
+
+    def get(self, canonical_key: str, version: str = "") -> Optional[bytes]:
+        """
+        Retrieves a cached response body.
+
+        Args:
+            canonical_key (str): Canonical form of the query.
+            version (str, optional): Current data version of the cube. Entries stored under another version are dropped. Defaults to "".
+
+        Returns:
+            Optional[bytes]: The response body, or None on a miss.
+        """
+        key = self.hash_key(canonical_key)
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                body = self._check(entry, version)
+                if body is not None:
+                    self.memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    self.counters["bytes_saved"] += len(body)
+                    return body
+                self._forget(key)
+
+            if self.connection is not None:
+                row = self.connection.execute("SELECT expires_at, version, body FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    expires_at, entry_version, compressed = row
+                    body = self._check((expires_at, entry_version, compressed), version)
+                    if body is not None:
+                        body = zlib.decompress(body)
+                        self._remember(key, (expires_at, entry_version, body))
+                        self.counters["disk_hits"] += 1
+                        self.counters["bytes_saved"] += len(body)
+                        return body
+                    self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.connection.commit()
+
+            self.counters["misses"] += 1
+        return None
+
+    def set(self, canonical_key: str, body: bytes, version: str = "") -> None:
+        """
+        Stores a response body in both tiers.
+
+        Args:
+            canonical_key (str): Canonical form of the query.
+            body (bytes): The response body.
+            version (str, optional): Current data version of the cube. Defaults to "".
+        """
+        key = self.hash_key(canonical_key)
+        expires_at = time.time() + self.ttl
+        with self.lock:
+            self._remember(key, (expires_at, version, body))
+            if self.connection is not None:
+                # expired bodies are purged on write, so the file does not keep every response ever fetched
+                self.connection.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, version, expires_at, body) VALUES (?, ?, ?, ?)",
+                    (key, version, expires_at, zlib.compress(body, self.compress_level))
+                )
+                self.connection.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            Dict[str, float]: Hits per tier, misses, expired and invalidated entries, hit ratio, bytes not downloaded again, and number and size of the responses held in memory.
+        """
+        with self.lock:
+            stats = dict(self.counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+            stats["memory_size"] = len(self.memory)
+            stats["memory_bytes"] = self.memory_bytes
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Retrieves the process-wide ResponseCache, configured from the environment.
+
+    Returns:
+        Optional[ResponseCache]: The shared cache, or None if RESPONSE_CACHE_SIZE is 0.
+    """
+    global _cache
+
+    if RESPONSE_CACHE_SIZE <= 0:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_PATH, max_bytes=RESPONSE_CACHE_BYTES)
+    return _cache
+
+
+def get_response_cache_stats() -> Dict[str, float]:
+    """
+    Retrieves the counters of the process-wide ResponseCache.
+
+    Returns:
+        Dict[str, float]: The counters of the cache, empty if it is disabled.
+    """
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {}
@@ -1,39 +1,109 @@
-import pandas as pd
-import requests
-import json
-
-from sentence_transformers import SentenceTransformer
 from typing import List
-from sqlalchemy import text as sql_text
 
-from config import POSTGRES_ENGINE, OLLAMA_API
+from config import POSTGRES_ENGINE, OLLAMA_API, OLLAMA_MAX_WORKERS, TABLES_PATH, SCHEMA_DRILLDOWNS, DRILLDOWNS_TABLE_NAME, DRILLDOWN_INDEX_BACKEND, DRILLDOWN_INDEX_SOURCE, DRILLDOWN_INDEX_QUANTIZATION, DRILLDOWN_INDEX_FULL_PRECISION_PATH
+from utils.drilldown_index import get_drilldown_index
+from utils.embedding_cache import normalize_text
+from utils.encoders import encode, get_embedding_cache
+from utils.ollama_client import OllamaEmbeddingClient
+from utils.vector_queries import match_drilldowns_batch_query, match_drilldowns_query, match_table_query
+
+EMBEDDING_COLUMN_NAME = {
+    'multi-qa-mpnet-base-cos-v1': 'embedding' #768 dimensions
+}
+
+
+def _match_drilldowns_postgres(embedding, cube_name, drilldown_names, threshold=0, content_limit=1, embedding_model='multi-qa-mpnet-base-cos-v1', verbose=False):
+    """
+    Looks for the members most similar to the embedding with the match_drilldowns SQL function.
+    Returns a list of (drilldown_id, drilldown, similarity, drilldown_name) tuples, best first.
+    """
+    matches = match_drilldowns_query(embedding, cube_name, drilldown_names, threshold, content_limit, EMBEDDING_COLUMN_NAME[embedding_model])
+    if verbose:
+        print(matches)
+
+    return matches
+
+
+def _match_drilldowns_memory(embedding, cube_name, drilldown_names, threshold=0, content_limit=1, embedding_model='multi-qa-mpnet-base-cos-v1', verbose=False):
+    """
+    Looks for the members most similar to the embedding in the in-process drilldown index.
+    Returns a list of (drilldown_id, drilldown, similarity, drilldown_name) tuples, best first.
+    """
+    index_kwargs = {
+        "quantization": None if DRILLDOWN_INDEX_QUANTIZATION == "float32" else DRILLDOWN_INDEX_QUANTIZATION,
+        "full_precision_path": DRILLDOWN_INDEX_FULL_PRECISION_PATH,
+    }
+    if DRILLDOWN_INDEX_SOURCE == "schema":
+        index = get_drilldown_index("schema", embedding_model, tables_path=TABLES_PATH, **index_kwargs)
+    else:
+        index = get_drilldown_index("database", embedding_model, engine=POSTGRES_ENGINE, schema_name=SCHEMA_DRILLDOWNS, table_name=DRILLDOWNS_TABLE_NAME, **index_kwargs)
+
+    matches = index.search(embedding, cube_name, drilldown_names, threshold=threshold, content_limit=content_limit)
+    if verbose:
+        print(matches)
+
+    return matches
+
+
+def match_drilldowns(embedding, cube_name, drilldown_names, threshold=0, content_limit=1, embedding_model='multi-qa-mpnet-base-cos-v1', verbose=False):
+    """
+    Looks for the members most similar to the embedding, using the backend set in DRILLDOWN_INDEX_BACKEND.
+    The in-process index falls back to Postgres when it holds no members for the given cube and levels.
+    Returns a list of (drilldown_id, drilldown, similarity, drilldown_name) tuples, best first.
+    """
+    matches = []
+    if DRILLDOWN_INDEX_BACKEND == "memory":
+        matches = _match_drilldowns_memory(embedding, cube_name, drilldown_names, threshold, content_limit, embedding_model, verbose)
+
+    if not matches:
+        matches = _match_drilldowns_postgres(embedding, cube_name, drilldown_names, threshold, content_limit, embedding_model, verbose)
+
+    return matches
+
 
 def get_similar_content(text, cube_name, drilldown_names, threshold=0, content_limit=1, embedding_model='multi-qa-mpnet-base-cos-v1', verbose=False):
     """
     Receives a string, computes its embedding, and then looks for similar content in a database based on the given cube and drilldown levels.
     Returns top match, similarity score, and others depending on the drilldown.
     """
-    embedding_column_name = {
-        'multi-qa-mpnet-base-cos-v1': 'embedding' #768 dimensions
-    }
+    embedding = encode([text], embedding_model)
+    matches = match_drilldowns(embedding[0], cube_name, drilldown_names, threshold, content_limit, embedding_model, verbose)
 
-    drilldown_names_array = "{" + ",".join(map(lambda x: f'"{x}"', drilldown_names)) + "}"
+    drilldown_id, drilldown, similarity, drilldown_name = matches[0]
 
-    model = SentenceTransformer(embedding_model)
-    embedding = model.encode([text])
-    query = """select drilldown_id, drilldown_name, drilldown, similarity from "match_drilldowns"('{}','{}' ,'{}','{}','{}', '{}'); """.format(embedding[0].tolist().__str__(), str(threshold), str(content_limit), str(cube_name), drilldown_names_array, embedding_column_name[embedding_model])
+    return drilldown_id, drilldown, similarity, drilldown_name
 
-    with POSTGRES_ENGINE.connect() as connection:
-            df = pd.read_sql_query(sql_text(query), connection)
-            if verbose: 
-                print(df)
 
-    drilldown_id = df.drilldown_id[0]
-    drilldown_name = df.drilldown_name[0]
-    drilldown = df.drilldown[0]
-    similarity = df.similarity[0]
+def get_similar_contents(texts, cube_name, drilldown_names_list, threshold=0, embedding_model='multi-qa-mpnet-base-cos-v1', verbose=False):
+    """
+    Batched version of get_similar_content. Encodes all the texts in one pass and resolves them in a single query
+    (or in the in-process index), each one against its own list of drilldown levels.
+    Returns a list with one (drilldown_id, drilldown, similarity, drilldown_name) tuple per text, in the same order.
+    """
+    if not texts:
+        return []
 
-    return drilldown_id, drilldown, similarity, drilldown_name
+    embeddings = encode(list(texts), embedding_model)
+
+    matches = [None] * len(texts)
+    if DRILLDOWN_INDEX_BACKEND == "memory":
+        for position, (embedding, drilldown_names) in enumerate(zip(embeddings, drilldown_names_list)):
+            results = _match_drilldowns_memory(embedding, cube_name, drilldown_names, threshold, 1, embedding_model, verbose)
+            if results:
+                matches[position] = results[0]
+
+    pending = [position for position, match in enumerate(matches) if match is None]
+    if pending:
+        rows = match_drilldowns_batch_query(
+            [embeddings[position] for position in pending], cube_name, [drilldown_names_list[position] for position in pending], threshold, EMBEDDING_COLUMN_NAME[embedding_model]
+        )
+        if verbose:
+            print(rows)
+
+        for position, drilldown_id, drilldown, similarity, drilldown_name in rows:
+            matches[pending[position]] = (drilldown_id, drilldown, similarity, drilldown_name)
+
+    return matches
 
 
 def get_similar_tables(vector, threshold=0, content_limit=1) -> List[str]:
@@ -41,42 +111,44 @@ def get_similar_tables(vector, threshold=0, content_limit=1) -> List[str]:
     Receives an embedding and then looks for similar content in a database. 
     Returns top match, similarity score, and others depending on the drilldown.
     """
-    query = """select table_name, similarity from "match_table"('{}','{}' ,'{}'); """.format(vector[0].tolist().__str__(), str(threshold), str(content_limit))
+    rows = match_table_query(vector[0], threshold, content_limit)
     
-    with POSTGRES_ENGINE.connect() as connection:
-        df = pd.read_sql_query(sql_text(query), connection)
-    
-    tables = df['table_name'].tolist()
+    tables = [table_name for table_name, similarity in rows]
 
     return tables
 
 
 def embedding(dataframe, column, model):
     """
-    Creates embeddings for text in the column passed as argument
+    Creates embeddings for text in the column passed as argument.
+    Rows whose embedding cannot be computed are dropped from the returned dataframe.
+    The embeddings are not written to the on-disk tier of the embedding cache, which is meant for queries.
     """
     if model == 'multi-qa-MiniLM-L6-cos-v1' or model == 'all-mpnet-base-v2' or model == 'all-MiniLM-L12-v2' or model == 'multi-qa-mpnet-base-cos-v1':
 
-        model = SentenceTransformer(model)
-
-        model_embeddings = model.encode(dataframe[column].to_list())
+        model_embeddings = encode(dataframe[column].to_list(), model, persist=False)
         dataframe['embedding'] = model_embeddings.tolist()
 
     else: 
-        url = "{}embeddings".format(OLLAMA_API)
-
-        for index, row in dataframe.iterrows():
-            text = row[column]
-
-            payload = {
-                "model": model,
-                "prompt": text
-            }
-
-            response = requests.post(url, json = payload)
-            embeddings_json = json.loads(response.text)
-            embedding = embeddings_json['embedding']
-            if embedding is not None:
-                dataframe.at[index, 'embedding'] = embedding
-
-    return dataframe
\ No newline at end of file
+        cache = get_embedding_cache()
+        keys = [normalize_text(text) for text in dataframe[column]]
+        vectors = {key: vector.tolist() for key, vector in cache.get_many(model, keys).items()}
+
+        missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+        if missing:
+            client = OllamaEmbeddingClient(OLLAMA_API, model, max_workers=OLLAMA_MAX_WORKERS)
+            embeddings = client.embed(missing)
+
+            computed = [(key, vector) for key, vector in zip(missing, embeddings) if vector is not None]
+            cache.set_many(model, computed, persist=False)
+            vectors.update(computed)
+
+        # rows whose embedding could not be computed are dropped, they would abort the COPY into the vector column
+        dataframe['embedding'] = [vectors.get(key) for key in keys]
+        failed = dataframe['embedding'].isna()
+        if failed.any():
+            failed_texts = dataframe.loc[failed, column].astype(str).tolist()
+            print(f"Dropped {len(failed_texts)} rows whose embedding could not be computed: {', '.join(failed_texts[:10])}{'...' if len(failed_texts) > 10 else ''}")
+            dataframe = dataframe[~failed].copy()
+
+    return dataframe
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import requests
+
+from collections import deque
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+
+from config import TESSERACT_CONNECT_TIMEOUT, TESSERACT_READ_TIMEOUT, TESSERACT_POOL_SIZE, TESSERACT_RETRIES
+
+
+class TesseractClient:
+    """
+    Shared HTTP client for the Tesseract API, with a keep-alive connection pool per host, timeouts, retries and call metrics.
+    """
+    def __init__(
+            self,
+            connect_timeout: float = 5,
+            read_timeout: float = 60,
+            pool_size: int = 16,
+            retries: int = 2,
+            recent_calls: int = 100
+            ):
+        """
+        Initializes the TesseractClient.
+
+        Args:
+            connect_timeout (float, optional): Seconds to wait for a connection. Defaults to 5.
+            read_timeout (float, optional): Seconds to wait between bytes of the response. Defaults to 60.
+            pool_size (int, optional): Maximum open connections per host. Requests beyond it wait for a free connection. Defaults to 16.
+            retries (int, optional): Retries on connection errors and 502/503/504 responses. Defaults to 2.
+            recent_calls (int, optional): Number of calls kept in the stats with their endpoint (without the query string), latency and size. Defaults to 100.
+        """
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "time": 0.0, "bytes": 0, "hosts": {}}
+        self.recent = deque(maxlen=recent_calls)
+
+    def get(self, url: str, headers: Dict[str, str] = None, **kwargs) -> requests.Response:
+        """
+        Makes a GET request through the connection pool.
+
+        Args:
+            url (str): The URL to request.
+            headers (Dict[str, str], optional): Extra headers, e.g. the Tesseract JWT token. Defaults to None.
+            **kwargs: Other arguments of requests.Session.get, e.g. timeout.
+
+        Returns:
+            requests.Response: The response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        start_time = time.perf_counter()
+        response = None
+        try:
+            response = self.session.get(url, headers=headers, **kwargs)
+            return response
+        finally:
+            latency = time.perf_counter() - start_time
+            # streamed responses are measured by the caller, when their body is read
+            size = len(response.content) if response is not None and not kwargs.get("stream") else 0
+            self._record(url, response, latency, size)
+
+    def _record(self, url: str, response, latency: float, size: int):
+        host = urlparse(url).netloc
+        failed = response is None or response.status_code >= 400
+        with self.lock:
+            self.stats["calls"] += 1
+            self.stats["errors"] += failed
+            self.stats["time"] += latency
+            self.stats["bytes"] += size
+            host_stats = self.stats["hosts"].setdefault(host, {"calls": 0, "errors": 0, "time": 0.0, "bytes": 0})
+            host_stats["calls"] += 1
+            host_stats["errors"] += failed
+            host_stats["time"] += latency
+            host_stats["bytes"] += size
+            # the query string carries the parameters of user questions, only the endpoint is kept
+            self.recent.append({
+                "url": urlparse(url)._replace(query="", fragment="").geturl(),
+                "status": response.status_code if response is not None else None,
+                "latency": latency,
+                "bytes": size,
+            })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retrieves the call metrics of the client.
+
+        Returns:
+            Dict[str, Any]: Totals and per-host calls, errors, seconds and bytes received, and the latest calls.
+        """
+        with self.lock:
+            stats = {key: value for key, value in self.stats.items() if key != "hosts"}
+            stats["hosts"] = {host: dict(host_stats) for host, host_stats in self.stats["hosts"].items()}
+            stats["recent"] = list(self.recent)
+        stats["mean_latency"] = stats["time"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_tesseract_client() -> TesseractClient:
+    """
+    Retrieves the process-wide TesseractClient, configured from the environment.
+
+    Returns:
+        TesseractClient: The shared client.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TesseractClient(
+                    connect_timeout=TESSERACT_CONNECT_TIMEOUT,
+                    read_timeout=TESSERACT_READ_TIMEOUT,
+                    pool_size=TESSERACT_POOL_SIZE,
+                    retries=TESSERACT_RETRIES,
+                )
+    return _client
@@ -0,0 +1,124 @@
+import numpy as np
+
+from pgvector.psycopg2 import register_vector
+from typing import List, Tuple
+
+from config import POSTGRES_ENGINE
+
+MATCH_DRILLDOWNS_STATEMENT = "match_drilldowns_query"
+MATCH_TABLE_STATEMENT = "match_table_query"
+
+
+def _prepare_vector_queries(dbapi_connection) -> None:
+    """
+    Registers the pgvector adapter and prepares the similarity statements on a connection of the pool.
+    """
+    register_vector(dbapi_connection)
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute(
+        f"PREPARE {MATCH_DRILLDOWNS_STATEMENT} (vector, double precision, integer, text, text[], text) AS "
+        "SELECT drilldown_id, drilldown_name, drilldown, similarity FROM match_drilldowns($1, $2, $3, $4, $5, $6)"
+    )
+    cursor.execute(
+        f"PREPARE {MATCH_TABLE_STATEMENT} (vector, double precision, integer) AS "
+        "SELECT table_name, similarity FROM match_table($1, $2, $3)"
+    )
+    cursor.close()
+    dbapi_connection.commit()
+
+
+def _fetch(query: str, params: tuple) -> list:
+    connection = POSTGRES_ENGINE.raw_connection()
+    try:
+        # prepared statements live as long as the pooled connection, so they are created once per connection
+        if not connection.info.get("vector_queries_prepared"):
+            _prepare_vector_queries(connection.dbapi_connection)
+            connection.info["vector_queries_prepared"] = True
+
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        connection.commit()
+    finally:
+        connection.close()
+    return rows
+
+
+def match_drilldowns_query(
+        embedding: np.ndarray,
+        cube_name: str,
+        drilldown_names: List[str],
+        threshold: float = 0,
+        content_limit: int = 1,
+        embedding_column: str = "embedding"
+        ) -> List[Tuple[str, str, float, str]]:
+    """
+    Runs the prepared match_drilldowns statement with the embedding as a bound parameter.
+
+    Args:
+        embedding (np.ndarray): Embedding of the text to match.
+        cube_name (str): The name of the cube.
+        drilldown_names (List[str]): Levels the member can belong to.
+        threshold (float, optional): Minimum similarity. Defaults to 0.
+        content_limit (int, optional): Number of matches to return. Defaults to 1.
+        embedding_column (str, optional): Column holding the embeddings. Defaults to "embedding".
+
+    Returns:
+        List[Tuple[str, str, float, str]]: Matches as (drilldown_id, drilldown, similarity, drilldown_name), best first.
+    """
+    rows = _fetch(
+        f"EXECUTE {MATCH_DRILLDOWNS_STATEMENT} (%s, %s, %s, %s, %s, %s)",
+        (np.asarray(embedding, dtype=np.float32), float(threshold), int(content_limit), cube_name, list(drilldown_names), embedding_column)
+    )
+    return [(drilldown_id, drilldown, similarity, drilldown_name) for drilldown_id, drilldown_name, drilldown, similarity in rows]
+
+
+def match_drilldowns_batch_query(
+        embeddings: List[np.ndarray],
+        cube_name: str,
+        drilldown_names_list: List[List[str]],
+        threshold: float = 0,
+        embedding_column: str = "embedding"
+        ) -> List[Tuple[int, str, str, float, str]]:
+    """
+    Runs match_drilldowns for several embeddings in a single statement, each one with its own list of levels.
+
+    Args:
+        embeddings (List[np.ndarray]): Embeddings of the texts to match.
+        cube_name (str): The name of the cube.
+        drilldown_names_list (List[List[str]]): Levels allowed for each embedding.
+        threshold (float, optional): Minimum similarity. Defaults to 0.
+        embedding_column (str, optional): Column holding the embeddings. Defaults to "embedding".
+
+    Returns:
+        List[Tuple[int, str, str, float, str]]: Top match of each embedding as (position, drilldown_id, drilldown, similarity, drilldown_name).
+    """
+    subqueries, params = [], []
+    for position, (embedding, drilldown_names) in enumerate(zip(embeddings, drilldown_names_list)):
+        subqueries.append(
+            "(SELECT %s AS position, drilldown_id, drilldown_name, drilldown, similarity FROM match_drilldowns(%s, %s, 1, %s, %s, %s))"
+        )
+        params.extend([position, np.asarray(embedding, dtype=np.float32), float(threshold), cube_name, list(drilldown_names), embedding_column])
+
+    rows = _fetch(" UNION ALL ".join(subqueries), tuple(params))
+    return [(position, drilldown_id, drilldown, similarity, drilldown_name) for position, drilldown_id, drilldown_name, drilldown, similarity in rows]
+
+
+def match_table_query(embedding: np.ndarray, threshold: float = 0, content_limit: int = 1) -> List[Tuple[str, float]]:
+    """
+    Runs the prepared match_table statement with the embedding as a bound parameter.
+
+    Args:
+        embedding (np.ndarray): Embedding of the question.
+        threshold (float, optional): Minimum similarity. Defaults to 0.
+        content_limit (int, optional): Number of tables to return. Defaults to 1.
+
+    Returns:
+        List[Tuple[str, float]]: Matches as (table_name, similarity), best first.
+    """
+    return _fetch(
+        f"EXECUTE {MATCH_TABLE_STATEMENT} (%s, %s, %s)",
+        (np.asarray(embedding, dtype=np.float32), float(threshold), int(content_limit))
+    )
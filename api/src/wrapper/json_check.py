@@ -1,7 +1,7 @@
 import json
 from os import getenv
 from table_selection.table_selector import request_tables_to_lm_from_db
-from table_selection.table import TableManager
+from table_selection.table import get_table_manager
 
 from config import TABLES_PATH
 
@@ -107,7 +107,7 @@ def set_form_json(query):
 
     Return: form_json
     """
-    table_manager = TableManager(TABLES_PATH)
+    table_manager = get_table_manager(TABLES_PATH)
     selected_table, form_json, token_tracker = request_tables_to_lm_from_db(query, table_manager, {})
     if selected_table:
         #form_json = json.loads(form_json)
@@ -15,7 +15,7 @@ from langchain_core.runnables import (
     chain,
 )
 from langchain_openai import ChatOpenAI, OpenAI
-from table_selection.table import TableManager
+from table_selection.table import get_table_manager
 from wrapper.json_check import json_iterator, set_form_json
 from wrapper.logsHandlerCallback import logsHandler
 
@@ -374,7 +374,7 @@ def route_answer(info):
         missing = json_iterator(form_json)
 
         # Missing questions
-        table_manager = TableManager(TABLES_PATH)
+        table_manager = get_table_manager(TABLES_PATH)
         table = table_manager.get_table(form_json["cube"])
         print("MISSING: ", missing)
         if missing:
@@ -533,7 +533,7 @@ simple_check = check_template.pipe(model_basic.bind(system=question_sys_prompt,
 def assistant(info):
     query = info["chathistory"]
     handleAPIBuilder = info["handleAPIBuilder"]
-    manager = TableManager(TABLES_PATH)
+    manager = get_table_manager(TABLES_PATH)
     table = manager.get_table("trade_i_baci_a_92")
     response = handleAPIBuilder(query, form_json={}, step="get_api_params_from_lm", **{"table": table, "start_time": time.time()})
     return json.dumps({"content": [i for i in response], "form_json": {}})